@@ -0,0 +1,16 @@
+"""
+Helpers shared by the benchmarks.
+"""
+
+import time
+from typing import Callable
+
+
+def best_time(func: Callable[[], object], repeat: int = 1) -> float:
+    """Returns the best wall-clock time out of {repeat} runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,42 @@
+"""
+Compares the throughput of the parallel Reed-Solomon encoder used by apply_ecc()
+against the original, sequential RSCodec.encode() path.
+
+Run from the root of the repository: python -m benchmarks.bench_ecc
+"""
+
+import argparse
+import os
+
+from benchmarks._util import best_time
+from youbit.ecc.creedsolo import RSCodec
+from youbit.ecc.ecc import apply_ecc
+
+ECC_SYMBOLS = (8, 16, 32, 64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=25, help="Input size in MB.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}, input: {args.size} MB")
+    print(f"{'ecc':>4} {'sequential MB/s':>16} {'parallel MB/s':>14} {'speedup':>8}")
+    for ecc_symbols in ECC_SYMBOLS:
+        message_size = 255 - ecc_symbols
+        data = os.urandom(args.size * 1_000_000 // message_size * message_size)
+        codec = RSCodec(ecc_symbols)
+        assert codec.encode(data) == apply_ecc(data, ecc_symbols)
+
+        sequential = best_time(lambda: codec.encode(data), args.repeat)
+        parallel = best_time(lambda: apply_ecc(data, ecc_symbols), args.repeat)
+        megabytes = len(data) / 1_000_000
+        print(
+            f"{ecc_symbols:>4} {megabytes / sequential:>16.2f} "
+            f"{megabytes / parallel:>14.2f} {sequential / parallel:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
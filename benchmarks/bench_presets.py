@@ -0,0 +1,82 @@
+"""
+Measures, for every x264 preset, resolution and bpp, how many frames per second
+VideoEncoder encodes, and what fraction of bytes can no longer be read after the
+video went through calibrate.transcode(), the local stand-in for YouTube.
+A faster preset is worth it as long as the ECC can still make up for its errors.
+
+Run from the root of the repository: python -m benchmarks.bench_presets
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks._util import best_time
+from youbit.calibrate import YOUTUBE_BITRATES, measure_errors
+from youbit.settings import BitsPerPixel, Preset, Resolution, Settings
+from youbit.tempdir import TempDir
+from youbit.transform import bytes_to_frames, frame_capacity
+from youbit.video import VideoEncoder
+
+
+def _encode_fps(settings: Settings, frames: int, directory) -> float:
+    data = np.frombuffer(os.urandom(frames * frame_capacity(settings)), dtype=np.uint8)
+    pixels = bytes_to_frames(data, settings)
+
+    def encode() -> None:
+        with VideoEncoder(directory / "bench.mp4", settings) as encoder:
+            encoder.feed(pixels)
+
+    return frames / best_time(encode)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=10, help="Frames to encode.")
+    parser.add_argument("--crf", type=int, default=18)
+    parser.add_argument(
+        "--presets",
+        nargs="+",
+        default=["ultrafast", "veryfast", "medium", "slow"],
+        choices=[preset.value for preset in Preset],
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        default=["HD"],
+        choices=[resolution.name for resolution in Resolution],
+    )
+    parser.add_argument("--bpp", nargs="+", type=int, default=[1, 2, 3])
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}, frames: {args.frames}, crf: {args.crf}")
+    print(
+        f"{'preset':>10} {'res':>4} {'bpp':>4} {'encode fps':>11} {'byte errors':>12}"
+    )
+    with TempDir() as tempdir:
+        for resolution in args.resolutions:
+            for bpp in args.bpp:
+                for preset in args.presets:
+                    settings = Settings(
+                        resolution=Resolution[resolution],
+                        bits_per_pixel=BitsPerPixel(bpp),
+                        constant_rate_factor=args.crf,
+                        preset=Preset(preset),
+                    )
+                    fps = _encode_fps(settings, args.frames, tempdir.path)
+                    comparison = measure_errors(
+                        settings, YOUTUBE_BITRATES[settings.resolution], tempdir.path
+                    )
+                    error_rate = (
+                        comparison["incorrect_byte_count"]
+                        / comparison["total_byte_count"]
+                    )
+                    print(
+                        f"{preset:>10} {resolution:>4} {bpp:>4} {fps:>11.2f} "
+                        f"{error_rate:>12.2e}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
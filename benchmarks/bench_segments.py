@@ -0,0 +1,72 @@
+"""
+Measures how many frames per second are encoded with every amount of parallel
+segments, see SegmentedVideoEncoder. With enough frames for every process, the
+speed should grow close to linearly with the cores in use.
+The time every process takes to start is included: it is part of every encode.
+
+Run from the root of the repository: python -m benchmarks.bench_segments
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks._util import best_time
+from youbit.settings import Preset, Resolution, Settings
+from youbit.tempdir import TempDir
+from youbit.transform import bytes_to_frames, frame_capacity
+from youbit.video import SegmentedVideoEncoder, VideoEncoder
+
+
+def _encode_fps(
+    settings: Settings, pixels: np.ndarray, frames: int, directory
+) -> float:
+    encoder_class = VideoEncoder
+    if settings.parallel_segments > 1:
+        encoder_class = SegmentedVideoEncoder
+
+    def encode() -> None:
+        with encoder_class(directory / "bench.mp4", settings) as encoder:
+            encoder.feed(pixels)
+
+    return frames / best_time(encode)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=200, help="Frames to encode.")
+    parser.add_argument(
+        "--segments", nargs="+", type=int, default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    parser.add_argument(
+        "--preset",
+        default="veryfast",
+        choices=[preset.value for preset in Preset],
+    )
+    parser.add_argument(
+        "--resolution",
+        default="HD",
+        choices=[resolution.name for resolution in Resolution],
+    )
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}, frames: {args.frames}, preset: {args.preset}")
+    print(f"{'segments':>8} {'encode fps':>11}")
+    with TempDir() as tempdir:
+        for segments in sorted(set(args.segments)):
+            settings = Settings(
+                resolution=Resolution[args.resolution],
+                preset=Preset(args.preset),
+                parallel_segments=segments,
+            )
+            data = np.frombuffer(
+                os.urandom(args.frames * frame_capacity(settings)), dtype=np.uint8
+            )
+            pixels = bytes_to_frames(data, settings)
+            fps = _encode_fps(settings, pixels, args.frames, tempdir.path)
+            print(f"{segments:>8} {fps:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares bytes_to_pixels(), which looks up the pixels of every byte (or every 3
+bytes with a bpp of 3) in a table, against the original path that first expands
+every byte into 8 bits with np.unpackbits().
+
+Run from the root of the repository: python -m benchmarks.bench_transform
+"""
+
+import argparse
+import os
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+from numba import njit, prange
+
+from benchmarks._util import best_time
+from youbit.settings import BitsPerPixel
+from youbit.transform import bytes_to_pixels, pixel_count
+from youbit.types import ndarr_1d_uint8
+
+
+def unpackbits_to_pixels(data: ndarr_1d_uint8, bpp: BitsPerPixel) -> ndarr_1d_uint8:
+    """The original approach: an array of bits, which is then mapped to pixels."""
+    sub_functions = {
+        BitsPerPixel.ONE: _bits_to_pixels_bpp1,
+        BitsPerPixel.TWO: _bits_to_pixels_bpp2,
+        BitsPerPixel.THREE: _bits_to_pixels_bpp3,
+    }
+    bits = np.unpackbits(data)
+    output = np.zeros(bits.size // bpp.value, dtype=np.uint8)
+    sub_functions[bpp](bits, output)
+    return output
+
+
+@njit("void(uint8[::1], uint8[::1])", parallel=True)
+def _bits_to_pixels_bpp1(arr, out) -> None:
+    MAPPING = np.array([0, 255], dtype=np.uint8)
+    for i in prange(out.size):
+        out[i] = MAPPING[arr[i]]
+
+
+@njit("void(uint8[::1], uint8[::1])", parallel=True)
+def _bits_to_pixels_bpp2(arr, out) -> None:
+    MAPPING = np.array([0, 96, 160, 255], dtype=np.uint8)
+    for i in prange(out.size):
+        j = i * 2
+        out[i] = MAPPING[(arr[j] << 1) | (arr[j + 1])]
+
+
+@njit("void(uint8[::1], uint8[::1])", parallel=True)
+def _bits_to_pixels_bpp3(arr, out) -> None:
+    MAPPING = np.array([0, 48, 80, 112, 144, 176, 208, 255], dtype=np.uint8)
+    for i in prange(out.size):
+        j = i * 3
+        out[i] = MAPPING[(arr[j] << 2) | (arr[j + 1] << 1) | (arr[j + 2])]
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    """Returns the peak amount of bytes allocated during {func}."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=24, help="Input size in MB.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = np.frombuffer(os.urandom(args.size * 1_000_000 // 3 * 3), dtype=np.uint8)
+    megabytes = data.size / 1_000_000
+    print(f"cores: {os.cpu_count()}, input: {megabytes:.0f} MB")
+    print(
+        f"{'bpp':>4} {'unpackbits MB/s':>16} {'table MB/s':>11} {'speedup':>8} "
+        f"{'unpackbits peak MB':>19} {'table peak MB':>14}"
+    )
+    # Peak memory includes the output array, which bytes_to_pixels() can also reuse.
+    # The original path predates the bpp of 4.
+    for bpp in (BitsPerPixel.ONE, BitsPerPixel.TWO, BitsPerPixel.THREE):
+        out = np.empty(pixel_count(data.size, bpp), dtype=np.uint8)
+        np.testing.assert_array_equal(
+            unpackbits_to_pixels(data, bpp), bytes_to_pixels(data, bpp, out=out)
+        )
+
+        unpacked = best_time(lambda: unpackbits_to_pixels(data, bpp), args.repeat)
+        table = best_time(lambda: bytes_to_pixels(data, bpp, out=out), args.repeat)
+        unpacked_peak = _peak_memory(lambda: unpackbits_to_pixels(data, bpp))
+        table_peak = _peak_memory(lambda: bytes_to_pixels(data, bpp))
+        print(
+            f"{bpp.value:>4} {megabytes / unpacked:>16.2f} {megabytes / table:>11.2f} "
+            f"{unpacked / table:>7.2f}x {unpacked_peak / 1_000_000:>19.1f} "
+            f"{table_peak / 1_000_000:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
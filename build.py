@@ -1,11 +1,30 @@
 import os
+import sys
 from distutils.command.build_ext import build_ext
+from distutils.extension import Extension
 
 from Cython.Build import cythonize
 
 
+def _openmp_flags() -> list[str]:
+    """The RS codec encodes independent codewords in parallel with OpenMP.
+    Apple's clang ships without OpenMP, there the loops simply run serially."""
+    if sys.platform == "win32":
+        return ["/openmp"]
+    if sys.platform == "darwin":
+        return []
+    return ["-fopenmp"]
+
+
 def build(setup_kwargs):
-    extensions = ["youbit/ecc/creedsolo.pyx"]
+    extensions = [
+        Extension(
+            "youbit.ecc.creedsolo",
+            ["youbit/ecc/creedsolo.pyx"],
+            extra_compile_args=_openmp_flags(),
+            extra_link_args=_openmp_flags(),
+        )
+    ]
     os.environ["CFLAGS"] = "-O3"
     setup_kwargs.update(
         {
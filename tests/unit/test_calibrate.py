@@ -0,0 +1,50 @@
+"""
+This file (test_calibrate.py) contains unit tests for the calibrate.py file.
+"""
+import numpy as np
+
+from youbit.calibrate import required_ecc_symbols
+from youbit.settings import ErrorCorrection
+
+
+def test_required_ecc_symbols_grows_with_errors() -> None:
+    mask = np.ones(255 * 1000, dtype=bool)
+    clean = required_ecc_symbols(mask, 1e-10)
+
+    mask[::100] = False  # a 1% byte error rate
+    noisy = required_ecc_symbols(mask, 1e-10)
+    assert clean is not None and noisy is not None
+    assert clean < noisy
+
+
+def test_required_ecc_symbols_covers_worst_codeword() -> None:
+    mask = np.ones(255 * 1000, dtype=bool)
+    mask[:40] = False  # one burst of 40 errors in the first codeword
+    assert required_ecc_symbols(mask, 1e-10) >= 80
+    assert required_ecc_symbols(mask, 1e-10, interleave_depth=8) < 80
+
+
+def test_required_ecc_symbols_impossible() -> None:
+    mask = np.zeros(255 * 1000, dtype=bool)
+    assert required_ecc_symbols(mask, 1e-10) is None
+
+
+def test_required_ecc_symbols_xor_parity() -> None:
+    xor = ErrorCorrection.XOR_PARITY
+    mask = np.ones(255 * 255 * 16, dtype=bool)
+    clean = required_ecc_symbols(mask, 1e-3, error_correction=xor)
+
+    mask[::25_000] = False  # about one lost packet in every 100
+    noisy = required_ecc_symbols(mask, 1e-3, error_correction=xor)
+    assert clean is not None and noisy is not None
+    assert clean < noisy
+    # One parity packet per class cannot keep blocks this large that safe.
+    assert required_ecc_symbols(mask, 1e-10, error_correction=xor) is None
+
+
+def test_required_ecc_symbols_xor_parity_covers_worst_block() -> None:
+    xor = ErrorCorrection.XOR_PARITY
+    mask = np.ones(255 * 255 * 16, dtype=bool)
+    mask[: 255 * 40 : 255] = False  # 40 consecutive lost packets in the first block
+    assert required_ecc_symbols(mask, 0.5, error_correction=xor) >= 40
+    assert required_ecc_symbols(mask, 0.5, 8, xor) < 40
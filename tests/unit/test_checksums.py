@@ -0,0 +1,44 @@
+"""
+This file (test_checksums.py) contains unit tests for the checksums.py file.
+"""
+import os
+import zlib
+
+from youbit.checksums import ChecksumWriter, region_size, MAX_CHECKSUMS
+
+
+def test_checksum_writer() -> None:
+    data = os.urandom(2500)
+    writer = ChecksumWriter(
+        region_size=2000, decoded_region_size=1000, encoded_size=6000
+    )
+    for i in range(0, len(data), 700):  # chunks that do not line up with the regions
+        writer.feed(data[i : i + 700])
+    table = writer.finish()
+
+    assert len(table) == 3
+    assert table.matches(0, data[:1000])
+    assert table.matches(1, data[1000:2000])
+    assert table.matches(2, data[2000:] + bytes(500))  # padded like the ECC pads it
+    assert not table.matches(2, data[2000:])
+    assert not table.matches(3, b"")
+    assert table.checksums[:4] == zlib.crc32(data[:1000]).to_bytes(4, "little")
+
+
+def test_checksum_writer_size_at_finish() -> None:
+    data = os.urandom(2500)
+    writer = ChecksumWriter(region_size=2000, decoded_region_size=1000)
+    writer.feed(data)
+    assert writer.data_size == 2500
+    table = writer.finish(encoded_size=6000)
+
+    assert table.encoded_size == 6000
+    assert len(table) == 3
+    assert table.matches(2, data[2000:] + bytes(500))
+
+
+def test_region_size() -> None:
+    assert region_size(10, 255) % 255 == 0
+    size = region_size(10**10, 255 * 16)
+    assert size % (255 * 16) == 0
+    assert -(10**10 // -size) <= MAX_CHECKSUMS
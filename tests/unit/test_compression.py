@@ -0,0 +1,42 @@
+"""
+This file (test_compression.py) contains unit tests for the compression.py file.
+"""
+import gzip
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from youbit.compression import (
+    compress_chunks,
+    decompress_chunks,
+    is_compressible,
+)
+from youbit.settings import Compression
+
+
+@pytest.mark.parametrize("compression", list(Compression))
+def test_compress_chunks(compression: Compression) -> None:
+    if compression is Compression.ZSTD:
+        pytest.importorskip("zstandard")
+    elif compression is Compression.LZ4:
+        pytest.importorskip("lz4")
+    chunks = [bytes(range(256)) * 1000, b"", b"YouBit" * 50_000]
+    compressed = b"".join(compress_chunks(chunks, compression))
+    if compression is not Compression.NONE:
+        assert len(compressed) < len(b"".join(chunks))
+    if compression is Compression.GZIP:
+        assert gzip.decompress(compressed) == b"".join(chunks)
+
+    parts = [compressed[i : i + 1000] for i in range(0, len(compressed), 1000)]
+    output = b"".join(decompress_chunks(parts, compression))
+    assert output == b"".join(chunks)
+
+
+def test_is_compressible(tempdir: Path) -> None:
+    rng = np.random.default_rng(0)
+    random_path, text_path = tempdir / "random.bin", tempdir / "text.txt"
+    random_path.write_bytes(rng.integers(0, 256, 5_000_000, dtype=np.uint8).tobytes())
+    text_path.write_bytes(b"YouBit stores files in YouTube videos. " * 100_000)
+    assert not is_compressible(random_path)
+    assert is_compressible(text_path)
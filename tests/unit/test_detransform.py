@@ -5,10 +5,17 @@ from pathlib import Path
 import os
 
 import numpy as np
+import pytest
 
-from youbit.detransform import pixels_to_bytes
+from youbit.detransform import (
+    pixels_to_bytes,
+    byte_confidence,
+    frames_to_bytes,
+    frames_confidence,
+)
+from youbit.transform import bytes_to_pixels, bytes_to_frames, frame_capacity
 from youbit.types import ndarr_1d_uint8
-from youbit.settings import BitsPerPixel
+from youbit.settings import BitsPerPixel, Settings
 
 
 def test_pixels_to_bytes(test_arr: ndarr_1d_uint8) -> None:
@@ -46,8 +53,58 @@ def test_pixels_to_bytes(test_arr: ndarr_1d_uint8) -> None:
         BitsPerPixel.THREE: solution_bpp3,
     }
 
-    for bpp in BitsPerPixel:
+    for bpp, solution in solutions.items():
         output = pixels_to_bytes(test_arr, bpp)
         desired_size = int(test_arr.size / 8) * bpp.value
         assert output.size == desired_size
-        np.testing.assert_array_equal(output, solutions[bpp])
+        np.testing.assert_array_equal(output, solution)
+
+
+def test_byte_confidence() -> None:
+    """WHEN a pixel is close to a threshold between two values
+    THEN verify if only the bytes it holds bits of get a low confidence."""
+    data = np.arange(24, dtype=np.uint8)
+    for bpp in BitsPerPixel:
+        pixels = bytes_to_pixels(data, bpp)
+        assert byte_confidence(pixels, bpp).min() >= (128 >> bpp.value) - 1
+
+        pixels[20] = 130  # just above the threshold of 128
+        confidence = byte_confidence(pixels, bpp)
+        low_bytes = {20 * bpp.value // 8, (20 * bpp.value + bpp.value - 1) // 8}
+        assert set(np.nonzero(confidence == 2)[0]) == low_bytes
+
+
+def test_pixels_to_bytes_reverses_bytes_to_pixels() -> None:
+    """WHEN we use pixels_to_bytes() on the output of bytes_to_pixels(), spanning
+    several blocks of the parallel kernels, with or without an output array.
+    THEN verify if the original data is returned
+    AND if the output array is used when given.
+    """
+    data = np.frombuffer(os.urandom(3 * 200_000), dtype=np.uint8)
+    for bpp in BitsPerPixel:
+        pixels = bytes_to_pixels(data, bpp)
+        np.testing.assert_array_equal(pixels_to_bytes(pixels, bpp), data)
+        out = np.empty(data.size, dtype=np.uint8)
+        assert pixels_to_bytes(pixels, bpp, out=out) is out
+        np.testing.assert_array_equal(out, data)
+        with pytest.raises(ValueError):
+            pixels_to_bytes(pixels, bpp, out=out[1:])
+
+
+def test_frames_to_bytes_reverses_bytes_to_frames() -> None:
+    """WHEN we use frames_to_bytes() on the output of bytes_to_frames(), with data
+    in the chroma planes.
+    THEN verify if every frame is a yuv420p frame
+    AND if the original data is returned, with a confidence for every byte.
+    """
+    settings = Settings(
+        bits_per_pixel=BitsPerPixel.TWO, chroma_bits_per_pixel=BitsPerPixel.ONE
+    )
+    width, height = settings.resolution.value
+    data = np.frombuffer(os.urandom(2 * frame_capacity(settings)), dtype=np.uint8)
+    frames = bytes_to_frames(data, settings)
+    assert frames.size == 2 * width * height * 3 // 2
+    np.testing.assert_array_equal(frames_to_bytes(frames, settings), data)
+    assert frames_confidence(frames, settings).size == data.size
+    with pytest.raises(ValueError):
+        bytes_to_frames(data[1:], settings)
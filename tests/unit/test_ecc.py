@@ -1,4 +1,17 @@
-from youbit.ecc.ecc import apply_ecc, remove_ecc
+import numpy as np
+import pytest
+
+from youbit.ecc.backends import FECError
+from youbit.ecc.creedsolo import RSCodec, ReedSolomonError
+from youbit.ecc.ecc import (
+    apply_ecc,
+    remove_ecc,
+    strip_ecc,
+    get_codec,
+    encoded_size,
+    decoded_size,
+)
+from youbit.settings import ErrorCorrection
 from youbit.types import ndarr_1d_uint8
 
 
@@ -11,8 +24,129 @@ def test_add_trailing_bytes() -> None:
 def test_ecc(test_arr: ndarr_1d_uint8) -> None:
     arr = test_arr.tobytes()
     ecc_arr = apply_ecc(arr, ecc_symbols=20)
-    assert arr != ecc_arr
+    assert arr != ecc_arr.tobytes()
     assert len(ecc_arr) > len(arr)
 
     back_again_arr = remove_ecc(ecc_arr, 20)
-    assert arr == back_again_arr[:-40]  # 40 zeros should have been appended
+    assert arr == back_again_arr[:-40].tobytes()  # 40 zeros should have been appended
+
+
+def test_ecc_identical_to_sequential_encoder(test_arr: ndarr_1d_uint8) -> None:
+    for ecc_symbols in (8, 16, 32, 64):
+        arr = test_arr[: (255 - ecc_symbols) * 1000].tobytes()
+        assert apply_ecc(arr, ecc_symbols).tobytes() == RSCodec(ecc_symbols).encode(arr)
+
+
+def test_remove_ecc_corrects_errors(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[: 223 * 1000].tobytes()
+    ecc_arr = apply_ecc(arr, ecc_symbols=32)
+    for i in range(0, len(ecc_arr), 255):
+        for j in range(i, i + 16):  # 16 errors in every codeword, the maximum
+            ecc_arr[j] ^= 0xFF
+    assert remove_ecc(ecc_arr, 32).tobytes() == arr
+
+
+def test_remove_ecc_too_many_errors(test_arr: ndarr_1d_uint8) -> None:
+    ecc_arr = apply_ecc(test_arr[: 223 * 10].tobytes(), ecc_symbols=32)
+    for j in range(255 * 5, 255 * 5 + 17):
+        ecc_arr[j] ^= 0xFF
+    with pytest.raises(ReedSolomonError):
+        remove_ecc(ecc_arr, 32)
+
+
+def test_codec_cache(test_arr: ndarr_1d_uint8) -> None:
+    assert get_codec(32) is get_codec(32)
+    arr = test_arr[: 223 * 10].tobytes()
+    ecc_arr = apply_ecc(arr, ecc_symbols=32)
+
+    RSCodec(32, prim=0x187)  # re-initializes the lookup tables with another polynomial
+    np.testing.assert_array_equal(apply_ecc(arr, ecc_symbols=32), ecc_arr)
+    assert remove_ecc(ecc_arr, 32).tobytes() == arr
+
+
+def test_ecc_into_output_buffers(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:100_000]
+    ecc_arr = np.empty(encoded_size(arr.size, 32), dtype=np.uint8)
+    assert apply_ecc(arr, 32, out=ecc_arr) is ecc_arr
+
+    back_again_arr = np.empty(decoded_size(ecc_arr.size, 32), dtype=np.uint8)
+    assert remove_ecc(ecc_arr, 32, out=back_again_arr) is back_again_arr
+    np.testing.assert_array_equal(back_again_arr[: arr.size], arr)
+    assert not back_again_arr[arr.size :].any()
+
+
+def test_interleaved_ecc_spreads_burst_errors(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:500_000]
+    ecc_arr = apply_ecc(arr, 32, interleave_depth=16)
+    assert ecc_arr.size == encoded_size(arr.size, 32, 16)
+    assert ecc_arr.size % (255 * 16) == 0
+
+    ecc_arr[1000:1200] ^= 0xFF  # a burst of 200 bytes: 13 errors per codeword
+    back_again_arr = remove_ecc(ecc_arr, 32, interleave_depth=16)
+    np.testing.assert_array_equal(back_again_arr[: arr.size], arr)
+
+    with pytest.raises(ReedSolomonError):
+        not_interleaved_arr = apply_ecc(arr, 32)
+        not_interleaved_arr[1000:1200] ^= 0xFF
+        remove_ecc(not_interleaved_arr, 32)
+
+
+def test_interleaved_ecc_ignores_trailing_padding(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:10_000]
+    ecc_arr = apply_ecc(arr, 32, interleave_depth=4)
+    padded_arr = np.append(ecc_arr, np.zeros(300, dtype=np.uint8))
+    back_again_arr = remove_ecc(padded_arr, 32, interleave_depth=4)
+    assert back_again_arr.size == decoded_size(padded_arr.size, 32, 4)
+    np.testing.assert_array_equal(back_again_arr[: arr.size], arr)
+
+
+def test_xor_parity_recovers_lost_packets(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:500_000]
+    ecc_arr = apply_ecc(arr, 32, error_correction=ErrorCorrection.XOR_PARITY)
+    assert ecc_arr.size == encoded_size(arr.size, 32, 1, ErrorCorrection.XOR_PARITY)
+
+    ecc_arr[1000 : 1000 + 255 * 31] ^= 0xFF  # a burst hitting 32 packets
+    ecc_arr[200_000] ^= 0xFF
+    back_again_arr = remove_ecc(
+        ecc_arr, 32, error_correction=ErrorCorrection.XOR_PARITY
+    )
+    np.testing.assert_array_equal(back_again_arr[: arr.size], arr)
+
+    ecc_arr[100_000 : 100_000 + 255 * 33] ^= 0xFF
+    with pytest.raises(FECError):
+        remove_ecc(ecc_arr, 32, error_correction=ErrorCorrection.XOR_PARITY)
+
+
+def test_xor_parity_ignores_trailing_padding(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:10_000]
+    ecc_arr = apply_ecc(arr, 8, 2, ErrorCorrection.XOR_PARITY)
+    padded_arr = np.append(ecc_arr, np.zeros(100_000, dtype=np.uint8))
+    back_again_arr = remove_ecc(padded_arr, 8, 2, ErrorCorrection.XOR_PARITY)
+    assert back_again_arr.size == decoded_size(
+        padded_arr.size, 8, 2, ErrorCorrection.XOR_PARITY
+    )
+    np.testing.assert_array_equal(back_again_arr[: arr.size], arr)
+    assert not back_again_arr[arr.size :].any()
+
+
+def test_remove_ecc_with_confidence(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[: 223 * 100].tobytes()
+    ecc_arr = apply_ecc(arr, 32, interleave_depth=4)
+    confidence = np.full_like(ecc_arr, 100)
+    for i in range(0, ecc_arr.size, 255):  # 20 errors per codeword, 14 of them known
+        ecc_arr[i : i + 20] ^= 0xFF
+        confidence[i : i + 14] = 0
+    back_again_arr = remove_ecc(ecc_arr, 32, interleave_depth=4, confidence=confidence)
+    assert back_again_arr.tobytes() == arr
+
+    with pytest.raises(ReedSolomonError):
+        remove_ecc(ecc_arr, 32, interleave_depth=4)
+
+
+def test_strip_ecc(test_arr: ndarr_1d_uint8) -> None:
+    arr = test_arr[:100_000]
+    for fec in ErrorCorrection:
+        ecc_arr = apply_ecc(arr, 32, 4, fec)
+        np.testing.assert_array_equal(
+            strip_ecc(ecc_arr, 32, 4, fec), remove_ecc(ecc_arr, 32, 4, fec)
+        )
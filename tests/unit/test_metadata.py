@@ -2,6 +2,7 @@ import pytest
 from importlib.metadata import version
 
 from youbit import Metadata
+from youbit.checksums import ChecksumTable
 from youbit.settings import Settings
 
 
@@ -56,3 +57,26 @@ def test_metadata_roundtrip() -> None:
 
     metadata2 = Metadata.create_from_base64(export_str)
     assert metadata == metadata2
+
+
+def test_metadata_roundtrip_with_checksums() -> None:
+    checksums = ChecksumTable(region_size=1 << 20, encoded_size=1 << 28)
+    checksums.checksums = bytes(range(256)) * 4
+    metadata = Metadata(settings=Settings(), checksums=checksums)
+    export_str = metadata.export_as_base64()
+    assert len(export_str) < 5000  # The limit of a YouTube video description
+
+    metadata2 = Metadata.create_from_base64(export_str)
+    assert metadata2.checksums == checksums
+
+
+def test_expected_hash() -> None:
+    assert Metadata(md5_hash="old").expected_hash == "old"
+    assert Metadata(md5_hash="old", file_hash="new").expected_hash == "new"
+    assert Metadata.create_from_base64(VALID_BASE64_METADATA).expected_hash
+
+
+def test_legacy_compression() -> None:
+    metadata = Metadata.create_from_base64(VALID_BASE64_METADATA)
+    assert metadata.compression is None  # Older versions always used gzip
+    assert metadata.data_size is None
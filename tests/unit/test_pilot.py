@@ -0,0 +1,50 @@
+"""
+This file (test_pilot.py) contains unit tests for the pilot.py file.
+"""
+import numpy as np
+
+from youbit import pilot
+from youbit.detransform import byte_confidence, frames_to_bytes
+from youbit.settings import BitsPerPixel, Settings
+from youbit.transform import MAPPING, bytes_to_frames, frame_capacity
+
+
+def _shift_levels(arr: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """A stand-in for YouTube: pulls all levels towards grey, and adds some noise."""
+    shifted = arr * 0.8 + 30 + rng.normal(0, 3, arr.size)
+    return np.clip(np.round(shifted), 0, 255).astype(np.uint8)
+
+
+def test_threshold_table_clean() -> None:
+    """WHEN the pilot frame is read back without any changes.
+    THEN verify if every pixel still reads as the level it was written as
+    AND if it is still far from a threshold."""
+    settings = Settings(bits_per_pixel=BitsPerPixel.THREE)
+    (table,) = pilot.read_pilot_frame(pilot.pilot_frame(settings), settings)
+    mapping = MAPPING[BitsPerPixel.THREE]
+    np.testing.assert_array_equal(table[mapping] >> 5, np.arange(8))
+    pixels = np.repeat(mapping, 8)
+    assert byte_confidence(table[pixels], BitsPerPixel.THREE).min() >= 15
+
+
+def test_threshold_table_shifted_levels() -> None:
+    """WHEN the levels of the pixels shift, in the pilot frame and the rest alike.
+    THEN verify if the tables of the pilot frame read far fewer bytes wrong."""
+    rng = np.random.default_rng(0)
+    for settings in (
+        Settings(bits_per_pixel=BitsPerPixel.THREE),
+        Settings(
+            bits_per_pixel=BitsPerPixel.THREE,
+            chroma_bits_per_pixel=BitsPerPixel.TWO,
+            block_size=2,
+        ),
+    ):
+        frame = pilot.pilot_frame(settings)
+        tables = pilot.read_pilot_frame(_shift_levels(frame, rng), settings)
+
+        data = rng.integers(0, 256, 2 * frame_capacity(settings), dtype=np.uint8)
+        pixels = _shift_levels(bytes_to_frames(data, settings), rng)
+        errors = (frames_to_bytes(pixels, settings) != data).mean()
+        pixels = pilot.apply_tables(pixels, tables, settings)
+        calibrated_errors = (frames_to_bytes(pixels, settings) != data).mean()
+        assert calibrated_errors < errors / 10
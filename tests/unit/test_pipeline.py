@@ -0,0 +1,107 @@
+"""
+This file (test_pipeline.py) contains unit tests for the pipeline.py file.
+"""
+import threading
+import time
+from typing import Any, Iterable, Iterator
+
+import numba
+import pytest
+
+from youbit import pipeline
+
+
+def test_ordered_map() -> None:
+    def slow_square(x: int) -> int:
+        time.sleep(0.01 * (x % 3))  # finish out of order
+        return x * x
+
+    output = list(pipeline.ordered_map(slow_square, range(20), workers=4, depth=6))
+    assert output == [x * x for x in range(20)]
+    assert list(pipeline.ordered_map(slow_square, [], workers=2, depth=2)) == []
+
+
+def test_ordered_map_error() -> None:
+    def fail_on_3(x: int) -> int:
+        if x == 3:
+            raise ValueError("3")
+        return x
+
+    output = []
+    with pytest.raises(ValueError):
+        for x in pipeline.ordered_map(fail_on_3, range(10), workers=2, depth=2):
+            output.append(x)
+    assert output == [0, 1, 2]
+
+
+def test_kernel_lock(monkeypatch: Any) -> None:
+    monkeypatch.setattr(numba, "threading_layer", lambda: "workqueue")
+    assert pipeline.kernel_lock() is pipeline.KERNEL_LOCK
+    monkeypatch.setattr(numba, "threading_layer", lambda: "tbb")
+    assert pipeline.kernel_lock() is not pipeline.KERNEL_LOCK
+
+    def not_initialized() -> str:
+        raise ValueError("Threading layer is not initialized.")
+
+    monkeypatch.setattr(numba, "threading_layer", not_initialized)
+    assert pipeline.kernel_lock() is pipeline.KERNEL_LOCK
+
+
+def test_prefetch() -> None:
+    threads = set()
+
+    def produce() -> Iterator[int]:
+        for i in range(100):
+            threads.add(threading.get_ident())
+            yield i
+
+    assert list(pipeline.prefetch(produce(), depth=3)) == list(range(100))
+    assert threading.get_ident() not in threads
+
+
+def test_prefetch_error() -> None:
+    def produce() -> Iterator[int]:
+        yield 1
+        raise ValueError("broken input")
+
+    with pytest.raises(ValueError):
+        list(pipeline.prefetch(produce(), depth=2))
+
+
+def test_prefetch_stops_early() -> None:
+    produced = []
+
+    def produce() -> Iterator[int]:
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    for i in pipeline.prefetch(produce(), depth=2):
+        if i == 5:
+            break
+    assert len(produced) < 1000
+
+
+def test_timings() -> None:
+    timings = pipeline.Timings()
+
+    def slow_source() -> Iterator[int]:
+        for i in range(3):
+            time.sleep(0.02)
+            yield i
+
+    def fast_stage(items: Iterable[int]) -> Iterator[int]:
+        for item in items:
+            yield item * 2
+
+    timed_double = timings.timed("double", lambda x: x * 2)
+    chunks = timings.timed_iter("source", slow_source())
+    chunks = timings.timed_stage("fast", fast_stage, chunks)
+    assert [timed_double(x) for x in chunks] == [0, 4, 8]
+    with timings.time("double"):
+        pass
+
+    assert timings.seconds["source"] >= 0.06
+    assert timings.seconds["fast"] < 0.02  # Waiting on the source is left out
+    assert set(timings.seconds) == {"source", "fast", "double"}
+    assert "source" in str(timings)
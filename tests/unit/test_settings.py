@@ -3,7 +3,16 @@ This file (test_encode.py) contains unit tests for the settings.py file.
 """
 import pytest
 
-from youbit.settings import Settings, Resolution, BitsPerPixel, Browser
+from youbit.settings import (
+    Settings,
+    Resolution,
+    BitsPerPixel,
+    Browser,
+    ErrorCorrection,
+    HashAlgorithm,
+    Compression,
+    Preset,
+)
 
 
 def test_settings_creation():
@@ -20,6 +29,21 @@ def test_setters_valid_settings():
     settings.constant_rate_factor = 25
     settings.null_frames = True
     settings.browser = Browser.CHROME
+    settings.interleave_depth = 16
+    settings.error_correction = ErrorCorrection.XOR_PARITY
+    settings.soft_decision = True
+    settings.hash_algorithm = HashAlgorithm.BLAKE2B
+    settings.bits_per_pixel = BitsPerPixel.FOUR
+    settings.chroma_bits_per_pixel = BitsPerPixel.ONE
+    settings.chroma_bits_per_pixel = None
+    settings.block_size = 4
+    settings.pilot_frame = True
+    settings.compression = Compression.ZSTD
+    settings.workers = 8
+    settings.queue_depth = 1
+    settings.preset = Preset.ULTRAFAST
+    settings.lossless = True
+    settings.parallel_segments = 4
 
 
 def test_setters_invalid_settings():
@@ -37,6 +61,32 @@ def test_setters_invalid_settings():
         settings.null_frames = "Should be boolean"
     with pytest.raises(ValueError):
         settings.browser = "Should be Browser object"
+    with pytest.raises(ValueError):
+        settings.interleave_depth = 0
+    with pytest.raises(ValueError):
+        settings.error_correction = "Should be ErrorCorrection object"
+    with pytest.raises(ValueError):
+        settings.soft_decision = "Should be boolean"
+    with pytest.raises(ValueError):
+        settings.hash_algorithm = "md5"
+    with pytest.raises(ValueError):
+        settings.chroma_bits_per_pixel = 1
+    with pytest.raises(ValueError):
+        settings.block_size = 3
+    with pytest.raises(ValueError):
+        settings.pilot_frame = "Should be boolean"
+    with pytest.raises(ValueError):
+        settings.compression = "gzip"
+    with pytest.raises(ValueError):
+        settings.workers = 0
+    with pytest.raises(ValueError):
+        settings.queue_depth = 0
+    with pytest.raises(ValueError):
+        settings.preset = "ultrafast"
+    with pytest.raises(ValueError):
+        settings.lossless = "Should be boolean"
+    with pytest.raises(ValueError):
+        settings.parallel_segments = 0
 
 
 def test_eq_true() -> None:
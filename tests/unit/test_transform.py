@@ -5,6 +5,7 @@ from pathlib import Path
 import os
 
 import numpy as np
+import pytest
 
 from youbit import transform
 from youbit.types import ndarr_1d_uint8
@@ -46,8 +47,40 @@ def test_bytes_to_pixels(test_arr: ndarr_1d_uint8) -> None:
         BitsPerPixel.THREE: solution_bpp3,
     }
 
-    for bpp in BitsPerPixel:
+    for bpp, solution in solutions.items():
         output = transform.bytes_to_pixels(test_arr, bpp)
         desired_size = int(test_arr.size * 8 / bpp.value)
         assert output.size == desired_size
-        np.testing.assert_array_equal(output, solutions[bpp])
+        np.testing.assert_array_equal(output, solution)
+
+
+def test_bytes_to_pixels_matches_bits(test_arr: ndarr_1d_uint8) -> None:
+    """WHEN we use bytes_to_pixels() on valid input, with or without an output array.
+    THEN verify if every pixel holds the next {bpp} bits of the input
+    AND if the output array is used when given.
+    """
+    bits = np.unpackbits(test_arr)
+    for bpp in BitsPerPixel:
+        levels = np.zeros(bits.size // bpp.value, dtype=np.uint8)
+        for i in range(bpp.value):
+            levels = (levels << 1) | bits[i :: bpp.value]
+        desired = transform.MAPPING[bpp][levels]
+
+        np.testing.assert_array_equal(transform.bytes_to_pixels(test_arr, bpp), desired)
+        out = np.empty(transform.pixel_count(test_arr.size, bpp), dtype=np.uint8)
+        output = transform.bytes_to_pixels(test_arr.tobytes(), bpp, out=out)
+        assert output is out
+        np.testing.assert_array_equal(out, desired)
+        with pytest.raises(ValueError):
+            transform.bytes_to_pixels(test_arr, bpp, out=out[1:])
+
+
+def test_bytes_to_pixels_trailing_bytes() -> None:
+    """WHEN we use bytes_to_pixels() with a bpp of 3 on input with a length that is
+    not a factor of 3.
+    THEN verify if the input is padded with nulls.
+    """
+    output = transform.bytes_to_pixels(b"\xff\xff\xff\xff", BitsPerPixel.THREE)
+    assert output.size == transform.pixel_count(4, BitsPerPixel.THREE) == 16
+    np.testing.assert_array_equal(output[:8], [255] * 8)
+    np.testing.assert_array_equal(output[8:], [255, 255, 208, 0, 0, 0, 0, 0])
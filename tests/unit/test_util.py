@@ -9,3 +9,12 @@ def test_is_url():
     invalid_url = ["htt://www.google.com", "://www.google.com", "E:/foo/bar"]
     assert all(list(map(util.is_url, valid_url)))
     assert not any(list(map(util.is_url, invalid_url)))
+
+
+def test_rechunk():
+    chunks = [b"\x01" * 5, b"\x02" * 2, b"", b"\x03" * 4]
+    output = list(util.rechunk(chunks, 3))
+    assert [chunk.size for chunk in output] == [3, 3, 3, 3]
+    assert b"".join(chunk.tobytes() for chunk in output) == b"".join(chunks) + bytes(1)
+    output = list(util.rechunk(chunks, 3, pad=False))
+    assert [chunk.size for chunk in output] == [3, 3, 3, 2]
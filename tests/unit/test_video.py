@@ -5,10 +5,24 @@ from pathlib import Path
 import os
 import warnings
 
+import av
 import numpy as np
 
-from youbit.video import VideoEncoder, VideoDecoder
-from youbit.settings import Settings
+from youbit import video
+from youbit.video import (
+    SegmentedVideoEncoder,
+    VideoEncoder,
+    VideoDecoder,
+    encoder_options,
+    expand_frame,
+    FramePool,
+    decimate_frame,
+    frame_format,
+    frame_shape,
+    stream_format,
+)
+from youbit.settings import BitsPerPixel, Preset, Settings
+from youbit.transform import frame_planes
 from youbit.types import ndarr_1d_uint8
 from youbit import util
 
@@ -40,3 +54,121 @@ def test_video_decoder(tempdir: Path, test_arr: ndarr_1d_uint8) -> None:
     output = np.concatenate(output, dtype=np.uint8)
 
     assert len(output) == len(test_arr)
+
+
+def test_expand_and_decimate_frame() -> None:
+    """WHEN we expand a frame into blocks, add some noise and decimate it again.
+    THEN verify if every block is made of a single value
+    AND if the average of every block is returned."""
+    for settings in (
+        Settings(block_size=4),
+        Settings(block_size=2, chroma_bits_per_pixel=BitsPerPixel.ONE),
+    ):
+        size = sum(height * width for (height, width), _ in frame_planes(settings))
+        frame = np.random.randint(8, 248, size, dtype=np.uint8)
+        expanded = expand_frame(frame, settings)
+        width, height = settings.resolution.value
+        assert expanded.shape[1] == width
+        block = settings.block_size
+        np.testing.assert_array_equal(expanded[:block, :block], frame[0])
+
+        noise = np.tile([-6, 6], expanded.size // 2).reshape(expanded.shape)
+        noisy = (expanded + noise).astype(np.uint8)
+        np.testing.assert_array_equal(decimate_frame(noisy, settings), frame)
+
+
+def test_encoder_options() -> None:
+    options = encoder_options(Settings(constant_rate_factor=30))
+    assert options["crf"] == "30"
+    assert options["preset"] == "medium"
+    assert "no-deblock=1" in options["x264-params"].split(":")
+    assert "sliced-threads=1" not in options["x264-params"].split(":")
+    options = encoder_options(Settings(preset=Preset.ULTRAFAST))
+    assert options["preset"] == "ultrafast"
+    assert "sliced-threads=1" in options["x264-params"].split(":")
+    assert options["threads"] == "0"
+    assert encoder_options(Settings(parallel_segments=64))["threads"] != "0"
+
+
+def test_lossless_round_trip(tempdir: Path) -> None:
+    for chroma_bpp in (None, BitsPerPixel.TWO):
+        settings = Settings(lossless=True, chroma_bits_per_pixel=chroma_bpp)
+        framesize = sum(height * width for (height, width), _ in frame_planes(settings))
+        arr = np.random.default_rng(0).integers(0, 256, framesize * 3, dtype=np.uint8)
+        video_filepath = tempdir / "lossless.mp4"
+        with VideoEncoder(video_filepath, settings) as encoder:
+            encoder.feed(arr)
+        with VideoDecoder(video_filepath, settings) as decoder:
+            output = decoder.extract_pixeldata(arr.size)
+        assert np.array_equal(output, arr)
+
+
+def test_frame_pool() -> None:
+    """WHEN frames are written into the frames of a pool
+    THEN verify if they hold what expand_frame() makes of the same values, in the
+    pixel format of the stream, as PyAV would convert them
+    AND if the frames are reused."""
+    for settings in (
+        Settings(),
+        Settings(lossless=True),
+        Settings(block_size=2, chroma_bits_per_pixel=BitsPerPixel.ONE),
+    ):
+        size = sum(height * width for (height, width), _ in frame_planes(settings))
+        pool = FramePool(settings, size=2)
+        frames = []
+        for _ in range(3):
+            arr = np.random.randint(0, 256, size, dtype=np.uint8)
+            frame = pool.frame(arr)
+            expected = av.VideoFrame.from_ndarray(
+                expand_frame(arr, settings), format=frame_format(settings)
+            ).reformat(format=stream_format(settings))
+            assert frame.format.name == stream_format(settings)
+            np.testing.assert_array_equal(frame.to_ndarray(), expected.to_ndarray())
+            frames.append(frame)
+        assert frames[0] is frames[2] and frames[0] is not frames[1]
+        null_frame = av.VideoFrame.from_ndarray(
+            np.zeros(frame_shape(settings), dtype=np.uint8),
+            format=frame_format(settings),
+        ).reformat(format=stream_format(settings))
+        np.testing.assert_array_equal(
+            pool.null_frame().to_ndarray(), null_frame.to_ndarray()
+        )
+
+
+def test_feed_and_extract_in_pieces(tempdir: Path) -> None:
+    """WHEN pixels are fed to the encoder, and extracted from the decoder, in pieces
+    that do not line up with the frames
+    THEN verify if the same pixels come out, in the same order."""
+    settings = Settings(lossless=True, null_frames=True)
+    framesize = sum(height * width for (height, width), _ in frame_planes(settings))
+    arr = np.random.default_rng(0).integers(0, 256, framesize * 3, dtype=np.uint8)
+    cuts = [0, 100, framesize // 2, framesize // 2 + 1, framesize * 2 + 7, arr.size]
+    video_filepath = tempdir / "pieces.mp4"
+    with VideoEncoder(video_filepath, settings) as encoder:
+        for start, end in zip(cuts, cuts[1:]):
+            encoder.feed(arr[start:end])
+    with VideoDecoder(video_filepath, settings) as decoder:
+        pieces = [decoder.extract_pixeldata(size) for size in (7, framesize, arr.size)]
+        assert decoder.extract_pixeldata(10).size == 0
+    assert [piece.size for piece in pieces] == [7, framesize, arr.size - framesize - 7]
+    assert np.array_equal(np.concatenate(pieces), arr)
+
+
+def test_segmented_video_encoder(tempdir: Path, monkeypatch) -> None:
+    """WHEN a video is encoded in segments of 2 frames, 2 at a time
+    THEN verify if the decoder reads the same pixels from it as they were fed
+    AND if the segments are gone."""
+    settings = Settings(lossless=True, null_frames=True, parallel_segments=2)
+    framesize = sum(height * width for (height, width), _ in frame_planes(settings))
+    monkeypatch.setattr(video, "SEGMENT_PIXELS", framesize * 2)
+    arr = np.random.default_rng(0).integers(0, 256, framesize * 5 + 9, dtype=np.uint8)
+    video_filepath = tempdir / "segmented.mp4"
+    with SegmentedVideoEncoder(video_filepath, settings) as encoder:
+        encoder.feed(arr[:framesize])
+        encoder.feed(arr[framesize:])
+    assert list(tempdir.iterdir()) == [video_filepath]
+    with VideoDecoder(video_filepath, settings) as decoder:
+        output = decoder.extract_pixeldata(framesize * 6)
+    assert output.size == framesize * 6
+    assert np.array_equal(output[: arr.size], arr)
+    assert not output[arr.size :].any()
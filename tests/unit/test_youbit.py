@@ -2,16 +2,24 @@
 This file (test_youbit.py) contains unit tests for the encode.py and decode.py files.
 """
 from pathlib import Path
+from typing import Any, Iterable
 import os
 import time
+import zipfile
+import zlib
 
+import pytest
 from yt_dlp.utils import DownloadError
 
 from tests.conftest import uploads
-from youbit import Encoder, download_and_decode
+from youbit import Encoder, Metadata, decode, decode_local, download_and_decode
+from youbit.checksums import ChecksumTable
 from youbit.settings import Settings, Browser
+from youbit.transform import frame_capacity
 from youbit.download import Downloader
+from youbit.types import ndarr_1d_uint8
 from youbit.util import get_md5
+from youbit.video import VideoDecoder
 
 
 @uploads
@@ -39,3 +47,82 @@ def test_youbit_round_trip(browser: Browser, tempdir: Path):
     original_md5 = get_md5(test_file)
     output_md5 = get_md5(output_path)
     assert original_md5 == output_md5
+
+
+def test_lossless_local_round_trip(tempdir: Path):
+    test_file = tempdir / "test_file.bin"
+    test_file.write_bytes(os.urandom(500_000) + b"YouBit" * 100_000)
+    encoder = Encoder(test_file, Settings(lossless=True, ecc_symbols=0))
+    archive = f"{encoder.encode_local(tempdir)}.zip"
+    with zipfile.ZipFile(archive) as zip_file:
+        zip_file.extractall(tempdir / "archive")
+        readme = zip_file.read("README.txt").decode()
+
+    metadata = Metadata.create_from_base64(readme.split()[-1])
+    output_dir = tempdir / "output"
+    output_dir.mkdir()
+    output_path = decode_local(tempdir / "archive" / "video.mp4", output_dir, metadata)
+    assert get_md5(output_path) == get_md5(test_file)
+
+
+def test_empty_file_round_trip(tempdir: Path):
+    test_file = tempdir / "empty_file.bin"
+    test_file.write_bytes(b"")
+    encoder = Encoder(test_file, Settings(lossless=True))
+    archive = f"{encoder.encode_local(tempdir)}.zip"
+    with zipfile.ZipFile(archive) as zip_file:
+        assert "video.mp4" in zip_file.namelist()
+        zip_file.extractall(tempdir / "archive")
+        readme = zip_file.read("README.txt").decode()
+
+    metadata = Metadata.create_from_base64(readme.split()[-1])
+    output_dir = tempdir / "output"
+    output_dir.mkdir()
+    output_path = decode_local(tempdir / "archive" / "video.mp4", output_dir, metadata)
+    assert output_path.read_bytes() == b""
+
+
+def test_decode_error_stops_video_thread(tempdir: Path, monkeypatch: Any) -> None:
+    test_file = tempdir / "test_file.bin"
+    test_file.write_bytes(os.urandom(100_000))
+    encoder = Encoder(test_file, Settings(lossless=True, queue_depth=1))
+    archive = f"{encoder.encode_local(tempdir)}.zip"
+    with zipfile.ZipFile(archive) as zip_file:
+        zip_file.extractall(tempdir / "archive")
+        readme = zip_file.read("README.txt").decode()
+    metadata = Metadata.create_from_base64(readme.split()[-1])
+
+    events = []
+    extract_pixeldata, close = VideoDecoder.extract_pixeldata, VideoDecoder.close
+
+    def slow_extract_pixeldata(self: VideoDecoder, size: int) -> ndarr_1d_uint8:
+        events.append("read")
+        time.sleep(0.2)
+        pixels = extract_pixeldata(self, size)
+        events.append("read done")
+        return pixels
+
+    def recorded_close(self: VideoDecoder) -> None:
+        events.append("close")
+        close(self)
+
+    def failing_decompress_chunks(chunks: Iterable[bytes], compression: Any) -> Any:
+        next(iter(chunks))
+        raise zlib.error("corrupted data")
+
+    monkeypatch.setattr(VideoDecoder, "extract_pixeldata", slow_extract_pixeldata)
+    monkeypatch.setattr(VideoDecoder, "close", recorded_close)
+    monkeypatch.setattr(decode, "decompress_chunks", failing_decompress_chunks)
+    with pytest.raises(zlib.error):
+        decode_local(tempdir / "archive" / "video.mp4", tempdir, metadata)
+    time.sleep(0.5)  # A thread that is still running would read on in the meantime
+    assert events[-2:] == ["read done", "close"]
+
+
+def test_frames_of_region() -> None:
+    settings = Settings()
+    bytes_per_frame = frame_capacity(settings)
+    region_size = bytes_per_frame * 9 // 2  # regions end halfway through a frame
+    checksums = ChecksumTable(region_size, region_size * 3 - 100)
+    ranges = [decode._frames_of_region(i, checksums, settings) for i in range(3)]
+    assert ranges == ["[0, 4)", "[4, 9)", "[9, 14)"]
@@ -11,7 +11,9 @@ from importlib.metadata import version
 import typer
 
 youbit_version = version("youbit")
-app = typer.Typer(help=f"YouBit v{youbit_version}", no_args_is_help=True, add_completion=False)
+app = typer.Typer(
+    help=f"YouBit v{youbit_version}", no_args_is_help=True, add_completion=False
+)
 test_app = typer.Typer(no_args_is_help=True)
 app.add_typer(test_app, name="test")
 
@@ -31,6 +33,41 @@ class ResChoice(str, Enum):
     UHD = "UHD"
 
 
+class HashChoice(str, Enum):
+    MD5 = "md5"
+    BLAKE2B = "blake2b"
+
+
+class FECChoice(str, Enum):
+    REED_SOLOMON = "rs"
+    XOR_PARITY = "xor"
+
+
+class PresetChoice(str, Enum):
+    ULTRAFAST = "ultrafast"
+    SUPERFAST = "superfast"
+    VERYFAST = "veryfast"
+    FASTER = "faster"
+    FAST = "fast"
+    MEDIUM = "medium"
+    SLOW = "slow"
+    SLOWER = "slower"
+    VERYSLOW = "veryslow"
+
+
+class BlockSizeChoice(str, Enum):
+    ONE = "1"
+    TWO = "2"
+    FOUR = "4"
+
+
+class CompressionChoice(str, Enum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    LZ4 = "lz4"
+
+
 ecc_option = typer.Option(
     32,
     help="Set the number of ECC symbols to use for FEC encoding. Set to 0 to disable ECC. Max 255.",
@@ -39,7 +76,24 @@ ecc_option = typer.Option(
 )
 res_option = typer.Option("HD", help="Set the video resolution.", case_sensitive=False)
 bpp_option = typer.Option(
-    1, help="The 'bpp' or 'Bits Per Pixel' value to use.", min=1, max=3
+    1,
+    help="The 'bpp' or 'Bits Per Pixel' value to use. 4 is experimental.",
+    min=1,
+    max=4,
+)
+chroma_bpp_option = typer.Option(
+    0,
+    help="The 'bpp' to also store data in the color (chroma) planes with. 0 leaves them empty. See the README.md for more information.",
+    min=0,
+    max=4,
+)
+pilot_frame_option = typer.Option(
+    False,
+    help="Whether or not to start the video with a frame of known data, to read the other frames more accurately. See the README.md for more information.",
+)
+block_size_option = typer.Option(
+    "1",
+    help="Store every value in a block of this many by this many pixels. See the README.md for more information.",
 )
 crf_option = typer.Option(
     18,
@@ -47,10 +101,66 @@ crf_option = typer.Option(
     min=0,
     max=52,
 )
+preset_option = typer.Option(
+    "medium",
+    help="The x264 preset to encode the video with. Faster presets make larger videos, which YouTube compresses harder.",
+    case_sensitive=False,
+)
+lossless_option = typer.Option(
+    False,
+    help="Whether or not to encode a lossless video, for local use only. See the README.md for more information.",
+)
 nullframes_option = typer.Option(
     False,
     help="Whether or not to use nullframes. See the README.md for more information.",
 )
+interleave_option = typer.Option(
+    1,
+    help="Spread the bytes of this many ECC codewords over each other, to survive burst errors. 1 disables interleaving.",
+    min=1,
+    max=65535,
+)
+soft_decision_option = typer.Option(
+    False,
+    help="Whether or not to let ECC use how reliable every pixel was when decoding. See the README.md for more information.",
+)
+hash_option = typer.Option(
+    "md5",
+    help="The hash used to verify the decoded file. BLAKE2b is faster on 64-bit machines.",
+    case_sensitive=False,
+)
+fec_option = typer.Option(
+    "rs",
+    help="The error correction to use: Reed-Solomon, or the faster XOR parity. See the README.md for more information.",
+    case_sensitive=False,
+)
+workers_option = typer.Option(
+    2,
+    help="The amount of threads for error correction and the (de)transformation, which run while the video is encoded or decoded.",
+    min=1,
+    max=64,
+)
+queue_depth_option = typer.Option(
+    2,
+    help="The amount of chunks every stage can work ahead. Memory use grows with it.",
+    min=1,
+    max=64,
+)
+parallel_segments_option = typer.Option(
+    1,
+    help="The amount of video segments to encode at the same time, each in a process of its own. Worth it for large files on many cores.",
+    min=1,
+    max=64,
+)
+timings_option = typer.Option(
+    False,
+    help="Whether or not to show how long every stage took, to find out which one limits the speed.",
+)
+compression_option = typer.Option(
+    "gzip",
+    help="The compression to apply before encoding. zstd and lz4 need extra packages. Skipped for files that hardly compress.",
+    case_sensitive=False,
+)
 
 
 @app.command("encode", no_args_is_help=True)
@@ -66,10 +176,32 @@ def encode_local(
     bpp: int = bpp_option,
     crf: int = crf_option,
     null_frames: bool = nullframes_option,
+    interleave: int = interleave_option,
+    fec: FECChoice = fec_option,
+    soft_decision: bool = soft_decision_option,
+    hash_algorithm: HashChoice = hash_option,
+    chroma_bpp: int = chroma_bpp_option,
+    block_size: BlockSizeChoice = block_size_option,
+    pilot_frame: bool = pilot_frame_option,
+    compression: CompressionChoice = compression_option,
+    workers: int = workers_option,
+    queue_depth: int = queue_depth_option,
+    preset: PresetChoice = preset_option,
+    timings: bool = timings_option,
+    lossless: bool = lossless_option,
+    parallel_segments: int = parallel_segments_option,
 ) -> None:
     from rich.console import Console
     from youbit import Encoder
-    from youbit.settings import Settings, Resolution, BitsPerPixel
+    from youbit.settings import (
+        Settings,
+        Resolution,
+        BitsPerPixel,
+        ErrorCorrection,
+        HashAlgorithm,
+        Compression,
+        Preset,
+    )
 
     settings = Settings(
         resolution=Resolution[res.upper()],
@@ -77,6 +209,19 @@ def encode_local(
         ecc_symbols=ecc,
         constant_rate_factor=crf,
         null_frames=null_frames,
+        interleave_depth=interleave,
+        error_correction=ErrorCorrection[fec.name],
+        soft_decision=soft_decision,
+        hash_algorithm=HashAlgorithm[hash_algorithm.name],
+        chroma_bits_per_pixel=BitsPerPixel(chroma_bpp) if chroma_bpp else None,
+        block_size=int(block_size.value),
+        pilot_frame=pilot_frame,
+        compression=Compression[compression.name],
+        workers=workers,
+        queue_depth=queue_depth,
+        preset=Preset[preset.name],
+        lossless=lossless,
+        parallel_segments=parallel_segments,
     )
     encoder = Encoder(input_path, settings)
 
@@ -86,6 +231,8 @@ def encode_local(
 
     console.rule(":green_circle:[bold green]Succes[/]:green_circle:")
     console.print(f"[green]File saved at: {output_path}.[/]")
+    if timings:
+        console.print(f"Time per stage: {encoder.timings}")
 
 
 @app.command("upload", no_args_is_help=True)
@@ -106,11 +253,32 @@ def encode_upload(
     bpp: int = bpp_option,
     crf: int = crf_option,
     nullframes: bool = nullframes_option,
+    interleave: int = interleave_option,
+    fec: FECChoice = fec_option,
+    soft_decision: bool = soft_decision_option,
+    hash_algorithm: HashChoice = hash_option,
+    chroma_bpp: int = chroma_bpp_option,
+    block_size: BlockSizeChoice = block_size_option,
+    pilot_frame: bool = pilot_frame_option,
+    compression: CompressionChoice = compression_option,
+    workers: int = workers_option,
+    queue_depth: int = queue_depth_option,
+    preset: PresetChoice = preset_option,
+    parallel_segments: int = parallel_segments_option,
 ) -> None:
     from rich.status import Status
     from rich.console import Console
     from youbit import Encoder
-    from youbit.settings import Settings, BitsPerPixel, Browser, Resolution
+    from youbit.settings import (
+        Settings,
+        BitsPerPixel,
+        Browser,
+        Resolution,
+        ErrorCorrection,
+        HashAlgorithm,
+        Compression,
+        Preset,
+    )
 
     console = Console()
     status = Status(f"Uploading {input_path}...", spinner="bouncingBall")
@@ -123,6 +291,18 @@ def encode_upload(
         constant_rate_factor=crf,
         null_frames=nullframes,
         browser=Browser[browser.name],
+        interleave_depth=interleave,
+        error_correction=ErrorCorrection[fec.name],
+        soft_decision=soft_decision,
+        hash_algorithm=HashAlgorithm[hash_algorithm.name],
+        chroma_bits_per_pixel=BitsPerPixel(chroma_bpp) if chroma_bpp else None,
+        block_size=int(block_size.value),
+        pilot_frame=pilot_frame,
+        compression=Compression[compression.name],
+        workers=workers,
+        queue_depth=queue_depth,
+        preset=Preset[preset.name],
+        parallel_segments=parallel_segments,
     )
     encoder = Encoder(input_path, settings)
     url = encoder.encode_and_upload()
@@ -144,17 +324,22 @@ def decode_local(
         ...,
         help="The base64-encoded metadata string usually found in the video description.",
     ),
+    timings: bool = timings_option,
 ) -> None:
     from rich.console import Console
     from youbit import decode_local, Metadata
+    from youbit.pipeline import Timings
 
     console = Console()
+    stage_timings = Timings()
     with console.status(f"Decoding '{str(input_path)}'...", spinner="bouncingBall"):
         metadata = Metadata.create_from_base64(metadata_str)
-        output_path = decode_local(input_path, output_dir, metadata)
+        output_path = decode_local(input_path, output_dir, metadata, stage_timings)
 
     console.rule(":green_circle:[bold green]Succes[/]:green_circle:")
     console.print(f"[green]File saved at: {str(output_path)}.[/]")
+    if timings:
+        console.print(f"Time per stage: {stage_timings}")
 
 
 @app.command("download", no_args_is_help=True)
@@ -204,6 +389,39 @@ def test_compare(file1: Path = typer.Argument(...), file2: Path = typer.Argument
     pprint(compare_files(file1, file2))
 
 
+@test_app.command("calibrate")
+def test_calibrate(
+    res: ResChoice = res_option,
+    target: float = typer.Option(
+        1e-10,
+        help="The highest acceptable fraction of ECC codewords that cannot be corrected.",
+    ),
+    bitrate: int = typer.Option(
+        None,
+        help="The bitrate (Kbps) YouTube is expected to use. Defaults to a rough average for the resolution.",
+    ),
+    interleave: int = interleave_option,
+    fec: FECChoice = fec_option,
+    null_frames: bool = nullframes_option,
+) -> None:
+    """Measures which 'bpp', 'ecc' and 'crf' store the most data while staying reliable,
+    by sending a small probe video through a local stand-in for YouTube's compression."""
+    from rich.console import Console
+    from rich.pretty import pprint
+    from youbit.calibrate import calibrate
+    from youbit.settings import Settings, Resolution, ErrorCorrection
+
+    settings = Settings(
+        resolution=Resolution[res.upper()],
+        null_frames=null_frames,
+        interleave_depth=interleave,
+        error_correction=ErrorCorrection[fec.name],
+    )
+    with Console().status("Calibrating...", spinner="bouncingBall"):
+        settings = calibrate(settings, target_error_rate=target, bitrate=bitrate)
+    pprint(settings)
+
+
 def main() -> None:
     app()
 
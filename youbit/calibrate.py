@@ -0,0 +1,276 @@
+"""
+Chooses the cheapest settings that still survive YouTube's compression.
+
+A small probe video is encoded locally, re-encoded by a stand-in for YouTube's
+own compression, and decoded again. The measured byte errors then tell us the
+smallest amount of ECC symbols every BitsPerPixel/crf combination needs to reach
+a target residual error rate with the configured ECC backend, and the combination
+that stores the most data per frame wins. Results are cached per resolution.
+"""
+from __future__ import annotations
+import copy
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import av
+import numpy as np
+
+from youbit import util
+from youbit.detransform import frames_to_bytes
+from youbit.ecc.ecc import block_size, message_size
+from youbit.pilot import apply_tables, pilot_frame, read_pilot_frame
+from youbit.settings import BitsPerPixel, ErrorCorrection, Resolution, Settings
+from youbit.tempdir import TempDir
+from youbit.transform import bytes_to_frames, frame_capacity
+from youbit.types import ndarr_1d_uint8
+from youbit.video import VideoEncoder, decimate_frame, frame_format
+
+
+# Rough average video bitrates (Kbps) YouTube serves YouBit videos at, see the README.
+YOUTUBE_BITRATES = {
+    Resolution.HD: 10_200,
+    Resolution.QHD: 20_000,
+    Resolution.UHD: 40_000,
+}
+# YouTube stores every frame of our 1 fps videos about 6 times (see VideoDecoder),
+# so each frame only gets a sixth of the bitrate.
+YOUTUBE_FRAMES_PER_FRAME = 6
+
+CANDIDATE_CRFS = (18, 23, 28)
+PROBE_FRAMES = 4
+CACHE_PATH = Path.home() / ".cache" / "youbit" / "calibration.json"
+
+
+def calibrate(
+    settings: Settings = Settings(),
+    target_error_rate: float = 1e-10,
+    bitrate: Optional[int] = None,
+    use_cache: bool = True,
+) -> Settings:
+    """Returns a copy of the given settings, with the BitsPerPixel, ECC symbols
+    and crf that store the most data per frame while the expected fraction of
+    uncorrectable ECC codewords stays below {target_error_rate}.
+    The YouTube stand-in re-encodes at {bitrate} Kbps, by default a rough average
+    of what YouTube uses for the resolution of the given settings.
+    """
+    if not 0 < target_error_rate < 1:
+        raise ValueError("The target error rate must be between 0 and 1 exclusive.")
+    bitrate = bitrate or YOUTUBE_BITRATES[settings.resolution]
+    key = settings.resolution.name
+    parameters = {
+        "target_error_rate": target_error_rate,
+        "bitrate": bitrate,
+        "error_correction": settings.error_correction.value,
+        "interleave_depth": settings.interleave_depth,
+        "null_frames": settings.null_frames,
+        "chroma_bits_per_pixel": getattr(settings.chroma_bits_per_pixel, "value", None),
+        "block_size": settings.block_size,
+        "pilot_frame": settings.pilot_frame,
+        "preset": settings.preset.value,
+    }
+
+    cache = _read_cache() if use_cache else {}
+    if (cached := cache.get(key)) and cached["parameters"] == parameters:
+        result = cached["result"]
+    else:
+        result = _measure_best_settings(settings, target_error_rate, bitrate)
+        cache[key] = {"parameters": parameters, "result": result}
+        _write_cache(cache)
+
+    calibrated_settings = copy.copy(settings)
+    calibrated_settings.bits_per_pixel = BitsPerPixel(result["bits_per_pixel"])
+    calibrated_settings.ecc_symbols = result["ecc_symbols"]
+    calibrated_settings.constant_rate_factor = result["constant_rate_factor"]
+    return calibrated_settings
+
+
+def _measure_best_settings(
+    settings: Settings, target_error_rate: float, bitrate: int
+) -> dict[str, int]:
+    best: dict[str, int] = {}
+    best_payload = 0.0
+    with TempDir() as tempdir:
+        for bpp in BitsPerPixel:
+            for crf in CANDIDATE_CRFS:
+                probe_settings = copy.copy(settings)
+                probe_settings.bits_per_pixel = bpp
+                probe_settings.constant_rate_factor = crf
+                comparison = measure_errors(probe_settings, bitrate, tempdir.path)
+                ecc_symbols = required_ecc_symbols(
+                    comparison["mask"],
+                    target_error_rate,
+                    settings.interleave_depth,
+                    settings.error_correction,
+                )
+                if ecc_symbols is None:
+                    continue
+                payload = (
+                    frame_capacity(probe_settings)
+                    * message_size(ecc_symbols, settings.error_correction)
+                    / block_size(ecc_symbols, settings.error_correction)
+                )
+                if payload > best_payload or (
+                    payload == best_payload and crf > best["constant_rate_factor"]
+                ):
+                    best_payload = payload
+                    best = {
+                        "bits_per_pixel": bpp.value,
+                        "ecc_symbols": ecc_symbols,
+                        "constant_rate_factor": crf,
+                    }
+    if not best:
+        raise RuntimeError(
+            f"No combination of settings reaches an error rate of {target_error_rate}."
+        )
+    return best
+
+
+def measure_errors(
+    settings: Settings, bitrate: int, directory: Union[Path, str]
+) -> dict[str, Any]:
+    """Encodes random data into a probe video with the given settings (without ECC),
+    sends it through transcode() and compares what can be read back to the original.
+    Returns the result of util.compare_files().
+    """
+    directory = Path(directory)
+    probe_size = PROBE_FRAMES * frame_capacity(settings)
+    probe = np.frombuffer(os.urandom(probe_size), dtype=np.uint8)
+    probe_path = directory / "probe.bin"
+    probe.tofile(probe_path)
+
+    video_path = directory / "probe.mp4"
+    with VideoEncoder(video_path, settings) as encoder:
+        if settings.pilot_frame:
+            encoder.feed(pilot_frame(settings))
+        encoder.feed(bytes_to_frames(probe, settings))
+    transcoded_path = directory / "probe_transcoded.mp4"
+    transcode(video_path, transcoded_path, bitrate)
+
+    pixels = _read_frames(transcoded_path, settings)
+    if settings.pilot_frame:
+        pilot_size = pilot_frame(settings).size
+        tables = read_pilot_frame(pixels[:pilot_size], settings)
+        pixels = apply_tables(pixels[pilot_size:], tables, settings)
+    output_path = directory / "probe_output.bin"
+    frames_to_bytes(pixels, settings).tofile(output_path)
+    return util.compare_files(probe_path, output_path)
+
+
+def transcode(input_file: Path, output_file: Path, bitrate: int) -> None:
+    """A local stand-in for YouTube: re-encodes a YouBit video with libx264 at
+    {bitrate} Kbps, spread over the frames YouTube would make of every frame."""
+    with av.open(str(input_file)) as input_container, av.open(
+        str(output_file), mode="w"
+    ) as output_container:
+        input_stream = input_container.streams.video[0]
+        output_stream = output_container.add_stream("libx264", rate=1)
+        output_stream.width = input_stream.codec_context.width
+        output_stream.height = input_stream.codec_context.height
+        output_stream.bit_rate = bitrate * 1000 // YOUTUBE_FRAMES_PER_FRAME
+        for frame in input_container.decode(input_stream):
+            frame.pts = None
+            output_container.mux(output_stream.encode(frame))
+        output_container.mux(output_stream.encode())
+
+
+def _read_frames(file: Path, settings: Settings) -> ndarr_1d_uint8:
+    """Unlike VideoDecoder, reads every frame: the video did not go through YouTube."""
+    with av.open(str(file)) as container:
+        frames = [
+            decimate_frame(frame.to_ndarray(format=frame_format(settings)), settings)
+            for frame in container.decode(video=0)
+        ]
+    if settings.null_frames:
+        frames = frames[::2]
+    return np.concatenate(frames, dtype=np.uint8)
+
+
+def required_ecc_symbols(
+    mask: np.ndarray,
+    target_error_rate: float,
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> Optional[int]:
+    """Returns the smallest amount of ECC symbols for which the expected fraction
+    of uncorrectable codewords stays below {target_error_rate}, or None if there is none.
+    {mask} holds True for every byte that was read back correctly.
+
+    The probe is far too small to observe rare failures, so the byte error rate is
+    used to model the amount of errors per codeword as a binomial distribution.
+    When no errors at all were measured, the 95% upper bound (3 / bytes) is used.
+    The codewords of the probe itself must of course be correctable as well.
+    """
+    byte_error_rate = max((~mask).mean(), 3 / mask.size)
+    if error_correction is ErrorCorrection.XOR_PARITY:
+        return _required_parity_packets(
+            mask, target_error_rate, interleave_depth, byte_error_rate
+        )
+    group_size = 255 * interleave_depth
+    errors = ~mask[: mask.size - mask.size % group_size]
+    errors_per_codeword = errors.reshape(-1, 255, interleave_depth).sum(axis=1)
+    worst_codeword = errors_per_codeword.max(initial=0)
+
+    for ecc_symbols in range(2, 255, 2):
+        correctable = ecc_symbols // 2
+        if worst_codeword > correctable:
+            continue
+        if _binomial_tail(255, byte_error_rate, correctable) <= target_error_rate:
+            return ecc_symbols
+    return None
+
+
+def _required_parity_packets(
+    mask: np.ndarray,
+    target_error_rate: float,
+    interleave_depth: int,
+    byte_error_rate: float,
+) -> Optional[int]:
+    """required_ecc_symbols() for XOR parity (see XORParityBackend): a single wrong
+    byte loses its whole packet, and a block is lost as soon as two packets of the
+    same parity class are.
+    """
+    packet_size = 255
+    group_size = 255 * packet_size * interleave_depth
+    errors = ~mask[: mask.size - mask.size % group_size]
+    blocks = errors.reshape(-1, 255, packet_size, interleave_depth)
+    lost_packets = blocks.any(axis=2).transpose(0, 2, 1).reshape(-1, 255)
+    packet_loss_rate = 1 - (1 - byte_error_rate) ** packet_size
+
+    for ecc_symbols in range(1, 255):
+        classes = np.arange(255) % ecc_symbols
+        lost_per_class = np.zeros((lost_packets.shape[0], ecc_symbols), dtype=int)
+        np.add.at(lost_per_class, (slice(None), classes), lost_packets)
+        if lost_per_class.max(initial=0) > 1:
+            continue
+        # Summed over the classes: an upper bound of the block failure rate.
+        failure_rate = sum(
+            _binomial_tail(class_size, packet_loss_rate, 1)
+            for class_size in np.bincount(classes)
+        )
+        if failure_rate <= target_error_rate:
+            return ecc_symbols
+    return None
+
+
+def _binomial_tail(n: int, p: float, k: int) -> float:
+    """Probability of more than {k} successes out of {n} trials with probability {p}."""
+    return sum(
+        math.comb(n, i) * p**i * (1 - p) ** (n - i) for i in range(k + 1, n + 1)
+    )
+
+
+def _read_cache() -> dict[str, Any]:
+    try:
+        with open(CACHE_PATH, "rt") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_cache(cache: dict[str, Any]) -> None:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(CACHE_PATH, "wt") as f:
+        json.dump(cache, f, indent=4)
@@ -0,0 +1,99 @@
+"""
+A compact table of checksums, kept in the Metadata of a video. The binary in a video
+(after error correction is applied) is split in regions of {region_size} bytes, and for
+every region the table holds the CRC32 of the data it decodes to.
+The decoder can then tell which regions came through clean without correcting them,
+and which regions could not be repaired at all.
+"""
+from __future__ import annotations
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from youbit.types import bytes_like
+
+
+# The table ends up in the description of the video, which has a limited size.
+MAX_CHECKSUMS = 256
+MIN_REGION_SIZE = 1 << 20
+
+
+@dataclass
+class ChecksumTable:
+    region_size: int
+    encoded_size: int
+    checksums: bytes = b""
+
+    def __len__(self) -> int:
+        return len(self.checksums) // 4
+
+    def matches(self, index: int, data: bytes_like) -> bool:
+        """Whether {data} is exactly what region {index} decodes to."""
+        if not 0 <= index < len(self):
+            return False
+        expected = int.from_bytes(self.checksums[index * 4 : index * 4 + 4], "little")
+        return zlib.crc32(data) == expected
+
+
+class ChecksumWriter:
+    """Builds a ChecksumTable from the data that is being encoded, fed in chunks
+    of any size. Every region of the video holds {decoded_region_size} bytes of it.
+    The {encoded_size} can be left to finish(), for data of which the size is only
+    known at the end."""
+
+    def __init__(
+        self,
+        region_size: int,
+        decoded_region_size: int,
+        encoded_size: Optional[int] = None,
+    ) -> None:
+        self._table = ChecksumTable(region_size, encoded_size or 0)
+        self._decoded_region_size = decoded_region_size
+        self._checksums = bytearray()
+        self._crc = 0
+        self._filled = 0
+        self._fed = 0
+
+    def feed(self, data: bytes_like) -> None:
+        data = memoryview(data).cast("B")
+        self._fed += len(data)
+        while data:
+            part = data[: self._decoded_region_size - self._filled]
+            self._crc = zlib.crc32(part, self._crc)
+            self._filled += len(part)
+            data = data[len(part) :]
+            if self._filled == self._decoded_region_size:
+                self._finish_region()
+
+    @property
+    def data_size(self) -> int:
+        """The amount of bytes fed so far."""
+        return self._fed
+
+    def finish(self, encoded_size: Optional[int] = None) -> ChecksumTable:
+        """Returns the table. The data is padded with zeros first, like the error
+        correction pads it to fill up the last codewords."""
+        if encoded_size is not None:
+            self._table.encoded_size = encoded_size
+        decoded_size = (
+            self._table.encoded_size
+            * self._decoded_region_size
+            // self._table.region_size
+        )
+        self.feed(bytes(decoded_size - self._fed))
+        if self._filled:
+            self._finish_region()
+        self._table.checksums = bytes(self._checksums)
+        return self._table
+
+    def _finish_region(self) -> None:
+        self._checksums += self._crc.to_bytes(4, "little")
+        self._crc = 0
+        self._filled = 0
+
+
+def region_size(encoded_size: int, unit: int) -> int:
+    """Returns a region size that is a multiple of {unit} bytes (a whole group of
+    codewords) and leads to at most MAX_CHECKSUMS regions for {encoded_size} bytes."""
+    size = max(-(encoded_size // -MAX_CHECKSUMS), MIN_REGION_SIZE)
+    return -(size // -unit) * unit
@@ -0,0 +1,113 @@
+"""
+The compression applied to a file before it is encoded, and removed after decoding.
+
+Besides gzip from the standard library, zstd (multithreaded) and lz4 are supported
+through the optional 'zstandard' and 'lz4' packages: pip install youbit[zstd,lz4].
+Already compressed files (media, archives) hardly get any smaller, which
+is_compressible() detects by compressing a few samples of the file.
+
+The encoder compresses on the fly with compress_chunks(), the decoder decompresses
+on the fly with decompress_chunks().
+"""
+from __future__ import annotations
+import importlib
+import zlib
+from pathlib import Path
+from types import ModuleType
+from typing import Generator, Iterable, Union
+
+from youbit.settings import Compression
+from youbit.types import bytes_like
+
+
+SAMPLES = 16
+SAMPLE_SIZE = 1 << 16
+# Below this ratio of compressed to original size, compressing a file is worth it.
+COMPRESSIBLE_RATIO = 0.95
+
+_PACKAGES = {
+    Compression.ZSTD: ("zstandard", "zstd"),
+    Compression.LZ4: ("lz4.frame", "lz4"),
+}
+
+
+def compress_chunks(
+    chunks: Iterable[bytes_like], compression: Compression
+) -> Generator[bytes_like, None, None]:
+    """Yields the compressed data of {chunks}, as they come in. With gzip, that is a
+    stream like gzip.open() writes."""
+    if compression is Compression.NONE:
+        yield from chunks
+        return
+    if compression is Compression.GZIP:
+        compressor = zlib.compressobj(9, wbits=31)  # 31: a gzip header and trailer
+    elif compression is Compression.ZSTD:
+        compressor = _import(compression).ZstdCompressor(threads=-1).compressobj()
+    else:
+        compressor = _import(compression).LZ4FrameCompressor()
+        yield compressor.begin()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def decompress_chunks(
+    chunks: Iterable[bytes_like], compression: Compression
+) -> Generator[bytes_like, None, None]:
+    """Yields the decompressed data of {chunks}, as compress_chunks() made them.
+    With gzip, anything after the end of the stream is ignored."""
+    if compression is Compression.NONE:
+        yield from chunks
+        return
+    if compression is Compression.GZIP:
+        decompressor = zlib.decompressobj(wbits=31)
+    elif compression is Compression.ZSTD:
+        decompressor = _import(compression).ZstdDecompressor().decompressobj()
+    else:
+        decompressor = _import(compression).LZ4FrameDecompressor()
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    if compression is Compression.GZIP:
+        yield decompressor.flush()
+
+
+def max_compressed_size(data_size: int, compression: Compression) -> int:
+    """Returns how large {data_size} bytes can get once compressed. Data that cannot
+    be compressed grows by a small fraction at most, for every supported codec."""
+    if compression is Compression.NONE:
+        return data_size
+    return data_size + data_size // 128 + 1024
+
+
+def is_compressible(file: Union[Path, str]) -> bool:
+    """Whether compressing {file} is worth it. {SAMPLES} evenly spaced samples of
+    the file are compressed with the fastest setting of zlib, which is a good enough
+    predictor for the other compressors."""
+    file = Path(file)
+    size = file.stat().st_size
+    if not size:
+        return False
+    offsets = range(0, size, max(size // SAMPLES, SAMPLE_SIZE))
+    original_size = compressed_size = 0
+    with open(file, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            sample = f.read(SAMPLE_SIZE)
+            original_size += len(sample)
+            compressed_size += len(zlib.compress(sample, 1))
+    return compressed_size < original_size * COMPRESSIBLE_RATIO
+
+
+def _import(compression: Compression) -> ModuleType:
+    module, extra = _PACKAGES[compression]
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(
+            f"{compression.name} compression needs the '{module.split('.')[0]}' "
+            f"package: pip install youbit[{extra}]"
+        ) from e
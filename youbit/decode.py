@@ -1,13 +1,30 @@
+import hashlib
+from contextlib import closing
+from functools import partial
 from pathlib import Path
-from typing import Union
-import shutil
-import gzip
+from typing import Generator, Iterable, Optional, Union
+import numpy as np
 
+from youbit import pipeline
+from youbit.checksums import ChecksumTable
+from youbit.compression import decompress_chunks
 from youbit.tempdir import TempDir
 from youbit.metadata import Metadata
-from youbit.ecc.ecc import remove_ecc
-from youbit.detransform import pixels_to_bytes
+from youbit.settings import Compression, Settings
+from youbit.ecc.backends import FECError
+from youbit.ecc.creedsolo import ReedSolomonError
+from youbit.ecc.ecc import remove_ecc, strip_ecc, block_size
+from youbit.detransform import (
+    pixels_to_bytes,
+    byte_confidence,
+    frames_to_bytes,
+    frames_confidence,
+)
 from youbit.download import Downloader
+from youbit.pilot import apply_tables, read_pilot_frame
+from youbit.pipeline import Timings
+from youbit.transform import frame_capacity
+from youbit.types import ndarr_1d_uint8
 from youbit.video import VideoDecoder
 
 
@@ -28,40 +45,311 @@ def download_and_decode(url: str, output_dir: Path) -> Path:
 
 
 def decode_local(
-    input_file: Union[Path, str], output_dir: Union[Path, str], metadata: Metadata
+    input_file: Union[Path, str],
+    output_dir: Union[Path, str],
+    metadata: Metadata,
+    timings: Optional[Timings] = None,
 ) -> Path:
+    """Decoding runs in stages at the same time (see pipeline.py): a thread decodes
+    the video, a pool of workers turns its pixels back into bytes and removes error
+    correction, and this thread decompresses and writes the output file. Pass
+    {timings} to find out how long every stage took."""
     input_file, output_dir = Path(input_file), Path(output_dir)
     if not input_file.exists() or not input_file.is_file():
         raise ValueError(f"'{input_file}' is not a valid file location.")
     if not output_dir.exists() or not output_dir.is_dir():
         raise ValueError(f"'{output_dir}' is not a valid directory.")
 
-    tempdir = TempDir()
-    still_zipped_path = tempdir.path / "bin.gz"
     settings = metadata.settings
+    output_path = _create_valid_path(output_dir, metadata)
+    file_hash = hashlib.new(settings.hash_algorithm.value)
+    failed_regions: list[int] = []
+    if timings is None:
+        timings = Timings()
 
     video_decoder = VideoDecoder(input_file, metadata.settings)
-    with open(still_zipped_path, "wb") as file:
-        chunk_size = 255_000_000  # Must be factor of 255 and 8.
-        while True:
-            pixeldata_arr = video_decoder.extract_pixeldata(chunk_size)
-            if not pixeldata_arr.size:
-                break
-            bytes_arr = pixels_to_bytes(pixeldata_arr, settings.bits_per_pixel)
-            if settings.ecc_symbols:
-                bytes_arr = remove_ecc(bytes_arr.tobytes(), settings.ecc_symbols)
-            file.write(bytes_arr)
-    video_decoder.close()
+    tables = None
+    if settings.pilot_frame:
+        pilot_arr = video_decoder.extract_pixeldata(video_decoder.framesize)
+        tables = read_pilot_frame(pilot_arr, settings)
+    decoded = _decoded_chunks(video_decoder, metadata, tables, failed_regions, timings)
+    chunks = _data_chunks(decoded, metadata.data_size, failed_regions)
+    # Older versions always used gzip
+    compression = metadata.compression or Compression.GZIP
+    chunks = timings.timed_stage(
+        "decompress", partial(decompress_chunks, compression=compression), chunks
+    )
+    try:
+        # The thread reading the video must be stopped before the video is closed.
+        with closing(decoded), open(output_path, "wb") as file:
+            for data in chunks:
+                with timings.time("write"):
+                    file_hash.update(data)
+                    file.write(data)
+    except Exception:
+        output_path.unlink()
+        raise
+    finally:
+        video_decoder.close()
 
-    output_path = _create_valid_path(output_dir, metadata)
-    _unzip_file(still_zipped_path, output_path)
-    tempdir.close()
+    if failed_regions:
+        failed_regions.sort()  # Workers can finish regions out of order
+        output_path.unlink()
+        raise CorruptedDataError(
+            "Parts of the video could not be repaired, in (data) frames "
+            + ", ".join(
+                _frames_of_region(i, metadata.checksums, settings)
+                for i in failed_regions
+            )
+            + ".",
+            failed_regions,
+        )
+    if metadata.expected_hash and file_hash.hexdigest() != metadata.expected_hash:
+        output_path.unlink()
+        raise CorruptedDataError(
+            f"The decoded file does not match the {settings.hash_algorithm.value} "
+            "hash of the original file."
+        )
     return output_path
 
 
-def _unzip_file(input_file: Path, output_path: Path) -> None:
-    with gzip.open(input_file, "rb") as f_in, open(output_path, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
+def _decoded_chunks(
+    video_decoder: VideoDecoder,
+    metadata: Metadata,
+    tables: Optional[list[ndarr_1d_uint8]],
+    failed_regions: list[int],
+    timings: Timings,
+) -> Generator[ndarr_1d_uint8, None, None]:
+    """Yields the data of the video, with error correction removed. Regions that
+    cannot be repaired, or that are missing because the video was cut short, end up
+    in {failed_regions}. Once this generator is closed, or raised an exception,
+    {video_decoder} is no longer used."""
+    settings, checksums = metadata.settings, metadata.checksums
+    workers, depth = settings.workers, settings.queue_depth
+    chunk_size = _chunk_size(settings, checksums)
+    pixels = timings.timed_iter(
+        "decode video", _pixel_chunks(video_decoder, settings, chunk_size)
+    )
+    prefetched = pipeline.prefetch(pixels, depth)
+    try:
+        chunks = pipeline.ordered_map(
+            timings.timed("detransform", partial(_detransform, settings, tables)),
+            prefetched,
+            workers,
+            depth,
+        )
+        if settings.chroma_bits_per_pixel:
+            chunks = _regroup(chunks, chunk_size // 8 * settings.bits_per_pixel.value)
+
+        if checksums is None:
+            if not settings.ecc_symbols:
+                yield from (bytes_arr for bytes_arr, _ in chunks)
+                return
+            remove = timings.timed("ecc", lambda chunk: _remove_ecc(*chunk, settings))
+            yield from pipeline.ordered_map(remove, chunks, workers, depth)
+            return
+
+        decode = timings.timed(
+            "ecc",
+            lambda region: _decode_region(*region, settings, checksums, failed_regions),
+        )
+        decoded = 0
+        for output in pipeline.ordered_map(
+            decode, _regions(chunks, checksums), workers, depth
+        ):
+            decoded += 1
+            yield output
+        failed_regions.extend(range(decoded, len(checksums)))
+    finally:
+        prefetched.close()  # Joins the thread decoding the video
+
+
+def _regions(
+    chunks: Iterable[tuple[ndarr_1d_uint8, Optional[ndarr_1d_uint8]]],
+    checksums: ChecksumTable,
+) -> Generator[tuple[int, ndarr_1d_uint8, Optional[ndarr_1d_uint8]], None, None]:
+    """Splits {chunks} into the regions of the checksums: yields the index of every
+    region, with its bytes and their confidence."""
+    region = 0
+    for bytes_arr, confidence in chunks:
+        for start in range(0, bytes_arr.size, checksums.region_size):
+            if region >= len(checksums):
+                return  # Only padding is left
+            end = start + min(
+                checksums.region_size,
+                checksums.encoded_size - region * checksums.region_size,
+            )
+            yield region, bytes_arr[start:end], (
+                None if confidence is None else confidence[start:end]
+            )
+            region += 1
+
+
+def _data_chunks(
+    chunks: Iterable[ndarr_1d_uint8],
+    data_size: Optional[int],
+    failed_regions: list[int],
+) -> Generator[ndarr_1d_uint8, None, None]:
+    """Yields the first {data_size} bytes of {chunks}, which leaves out the padding
+    of the video. Once a region failed, the rest of {chunks} is only read to find
+    the other failed regions: corrupted data is never decompressed."""
+    for chunk in chunks:
+        if failed_regions:
+            continue
+        if data_size is not None:
+            chunk = chunk[:data_size]
+            data_size -= chunk.size
+        if chunk.size:
+            yield chunk
+
+
+def _pixel_chunks(
+    video_decoder: VideoDecoder, settings: Settings, chunk_size: int
+) -> Generator[ndarr_1d_uint8, None, None]:
+    """Yields {chunk_size} pixels at a time, until the video runs out. With data in
+    the chroma planes, frames can only be read whole: chunks then hold as many whole
+    frames as fit in {chunk_size} pixels."""
+    if settings.chroma_bits_per_pixel:
+        size = chunk_size // 8 * settings.bits_per_pixel.value
+        frames = max(size // frame_capacity(settings), 1)
+        chunk_size = frames * video_decoder.framesize
+    while True:
+        pixeldata_arr = video_decoder.extract_pixeldata(chunk_size)
+        if not pixeldata_arr.size:
+            return
+        yield pixeldata_arr
+
+
+def _detransform(
+    settings: Settings,
+    tables: Optional[list[ndarr_1d_uint8]],
+    pixeldata_arr: ndarr_1d_uint8,
+) -> tuple[ndarr_1d_uint8, Optional[ndarr_1d_uint8]]:
+    """Returns the bytes the pixels hold, and with soft decision how reliable every
+    byte is. The pixels are first moved through the {tables} of the pilot frame, if
+    there is one."""
+    soft_decision = settings.ecc_symbols and settings.soft_decision
+    confidence = None
+    if tables is not None:
+        pixeldata_arr = apply_tables(pixeldata_arr, tables, settings)
+    with pipeline.kernel_lock():
+        if settings.chroma_bits_per_pixel:
+            bytes_arr = frames_to_bytes(pixeldata_arr, settings)
+            if soft_decision:
+                confidence = frames_confidence(pixeldata_arr, settings)
+        else:
+            bytes_arr = pixels_to_bytes(pixeldata_arr, settings.bits_per_pixel)
+            if soft_decision:
+                confidence = byte_confidence(pixeldata_arr, settings.bits_per_pixel)
+    return bytes_arr, confidence
+
+
+def _regroup(
+    chunks: Iterable[tuple[ndarr_1d_uint8, Optional[ndarr_1d_uint8]]], size: int
+) -> Generator[tuple[ndarr_1d_uint8, Optional[ndarr_1d_uint8]], None, None]:
+    """Yields the bytes and confidence of {chunks} again, in chunks with a length
+    that is a factor of {size}, except for the last one. Whole frames do not line up
+    with the chunks error correction needs: the rest of every chunk is carried over
+    to the next."""
+    bytes_arr = confidence = np.empty(0, dtype=np.uint8)
+    soft_decision = False
+    for new_bytes, new_confidence in chunks:
+        soft_decision = new_confidence is not None
+        bytes_arr = np.concatenate((bytes_arr, new_bytes))
+        if soft_decision:
+            confidence = np.concatenate((confidence, new_confidence))
+        ready_size = bytes_arr.size // size * size
+        if ready_size:
+            yield bytes_arr[:ready_size], (
+                confidence[:ready_size] if soft_decision else None
+            )
+            bytes_arr = bytes_arr[ready_size:]
+            confidence = confidence[ready_size:]
+    if bytes_arr.size:
+        yield bytes_arr, confidence if soft_decision else None
+
+
+class CorruptedDataError(Exception):
+    """Raised when a video could not be decoded without errors.
+    {regions} holds the indices of the regions (see checksums.py) that failed."""
+
+    def __init__(self, message: str, regions: Optional[list[int]] = None) -> None:
+        super().__init__(message)
+        self.regions = regions or []
+
+
+def _decode_region(
+    index: int,
+    data: ndarr_1d_uint8,
+    confidence: Optional[ndarr_1d_uint8],
+    settings: Settings,
+    checksums: ChecksumTable,
+    failed_regions: list[int],
+) -> ndarr_1d_uint8:
+    """Regions that came through clean are not corrected, their data is only
+    copied out of the codewords. Regions that cannot be repaired end up in
+    {failed_regions}."""
+    if not settings.ecc_symbols:
+        output = data
+    else:
+        output = strip_ecc(
+            data,
+            settings.ecc_symbols,
+            settings.interleave_depth,
+            settings.error_correction,
+        )
+        if not checksums.matches(index, output):
+            try:
+                output = _remove_ecc(data, confidence, settings)
+            except (ReedSolomonError, FECError):
+                pass
+    if not checksums.matches(index, output):
+        failed_regions.append(index)
+    return output
+
+
+def _remove_ecc(
+    data: ndarr_1d_uint8, confidence: Optional[ndarr_1d_uint8], settings: Settings
+) -> ndarr_1d_uint8:
+    return remove_ecc(
+        data,
+        settings.ecc_symbols,
+        settings.interleave_depth,
+        settings.error_correction,
+        confidence=confidence,
+    )
+
+
+def _frames_of_region(index: int, checksums: ChecksumTable, settings: Settings) -> str:
+    """Returns the (data) frames of a region as a half-open range. A frame holding the
+    end of one region and the start of the next is counted with the next, so
+    neighbouring regions do not name the same frame, unless they are both within it."""
+    bytes_per_frame = frame_capacity(settings)
+    start = index * checksums.region_size
+    end = min(start + checksums.region_size, checksums.encoded_size)
+    first_frame = start // bytes_per_frame
+    if end < checksums.encoded_size:
+        end_frame = end // bytes_per_frame
+    else:
+        end_frame = -(end // -bytes_per_frame)
+    return f"[{first_frame}, {max(end_frame, first_frame + 1)})"
+
+
+def _chunk_size(settings: Settings, checksums: Optional[ChecksumTable] = None) -> int:
+    """The amount of pixels to decode at once. Must be factor of 8, and
+    the bytes they hold a factor of block_size * interleave_depth (see remove_ecc()),
+    and of the region size of the checksums if there are any.
+    8 * {unit} pixels hold exactly {unit} * bpp bytes."""
+    if checksums is not None:
+        unit = checksums.region_size
+    elif settings.ecc_symbols:
+        unit = (
+            block_size(settings.ecc_symbols, settings.error_correction)
+            * settings.interleave_depth
+        )
+    else:
+        unit = 255
+    return 8 * unit * max(255 * 125_000 // unit, 1)
 
 
 def _create_valid_path(directory: Path, metadata: Metadata) -> Path:
@@ -1,60 +1,140 @@
+from typing import Callable, Optional
+
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 from youbit.types import ndarr_1d_uint8
-from youbit.settings import BitsPerPixel
+from youbit.settings import BitsPerPixel, Settings
+from youbit.transform import frame_planes
 
 
-def pixels_to_bytes(arr: ndarr_1d_uint8, bpp: BitsPerPixel) -> ndarr_1d_uint8:
+def pixels_to_bytes(
+    arr: ndarr_1d_uint8, bpp: BitsPerPixel, out: Optional[ndarr_1d_uint8] = None
+) -> ndarr_1d_uint8:
     """Reverses the bytes_to_pixels() function.
-    Reads pixel values and returns the original binary.
+    Reads pixel values and returns the original binary, written into 'out' if given.
+    'out' must then have a size of arr.size / 8 * bpp.
     Array length must be a factor of 8!
     """
     if arr.size % 8:
         raise ValueError(
             f"The length of the given array ({arr.size}) is not a factor of 8."
         )
+    size = arr.size // 8 * bpp.value
+    if out is None:
+        out = np.empty(size, dtype=np.uint8)
+    elif out.size != size:
+        raise ValueError(
+            f"The output array has a size of {out.size} instead of {size} bytes."
+        )
 
     SUB_FUNCTIONS = {
         BitsPerPixel.ONE: _detransform_bpp1,
         BitsPerPixel.TWO: _detransform_bpp2,
         BitsPerPixel.THREE: _detransform_bpp3,
+        BitsPerPixel.FOUR: _detransform_bpp4,
     }
 
-    output = SUB_FUNCTIONS[bpp](arr)
-    return output
+    SUB_FUNCTIONS[bpp](np.ascontiguousarray(arr), out)
+    return out
 
 
-def _detransform_bpp1(arr: ndarr_1d_uint8) -> ndarr_1d_uint8:
-    output = np.zeros(arr.size, dtype=np.uint8)
-    _detransform_bpp1_subfunc(arr, output)
-    array_of_bytes = np.packbits(output)
-    return array_of_bytes
+def frames_to_bytes(arr: ndarr_1d_uint8, settings: Settings) -> ndarr_1d_uint8:
+    """Reverses the bytes_to_frames() function. Without chroma_bits_per_pixel, this
+    is pixels_to_bytes(). Otherwise, the array must hold a whole number of frames."""
+    if not settings.chroma_bits_per_pixel:
+        return pixels_to_bytes(arr, settings.bits_per_pixel)
+    return _read_frames(arr, settings, pixels_to_bytes)
 
 
-def _detransform_bpp2(arr: ndarr_1d_uint8) -> ndarr_1d_uint8:
-    output_size = out_size = int(arr.size / 4)
-    output = np.zeros(output_size, dtype=np.uint8)
-    _detransform_bpp2_subfunc(arr, output)
-    return output
+def frames_confidence(arr: ndarr_1d_uint8, settings: Settings) -> ndarr_1d_uint8:
+    """Like byte_confidence(), for every byte frames_to_bytes() reads."""
+    if not settings.chroma_bits_per_pixel:
+        return byte_confidence(arr, settings.bits_per_pixel)
+    return _read_frames(arr, settings, byte_confidence)
 
 
-def _detransform_bpp3(arr: ndarr_1d_uint8) -> ndarr_1d_uint8:
-    output_size = int(arr.size / 8) * 3
-    output = np.zeros(output_size, dtype=np.uint8)
-    _detransform_bpp3_subfunc(arr, output)
+def _read_frames(
+    arr: ndarr_1d_uint8,
+    settings: Settings,
+    function: Callable[[ndarr_1d_uint8, BitsPerPixel], ndarr_1d_uint8],
+) -> ndarr_1d_uint8:
+    """Applies {function} to the luma and to the chroma planes of every frame."""
+    planes = frame_planes(settings)
+    (height, width), bpp = planes[0]
+    frame_size = sum(height * width for (height, width), _ in planes)
+    if arr.size % frame_size:
+        raise ValueError(
+            f"The length of the given array ({arr.size}) is not a factor of "
+            f"the size of a frame ({frame_size})."
+        )
+    frames = arr.reshape(-1, frame_size)
+    return np.concatenate(
+        [
+            np.concatenate(
+                (
+                    function(frame[: height * width], bpp),
+                    function(frame[height * width :], settings.chroma_bits_per_pixel),
+                )
+            )
+            for frame in frames
+        ]
+    )
+
+
+def byte_confidence(arr: ndarr_1d_uint8, bpp: BitsPerPixel) -> ndarr_1d_uint8:
+    """Returns, for every byte pixels_to_bytes() reads from the same array, how far
+    the least reliable pixel holding it was from a threshold between two values.
+    0 means a pixel was right next to a threshold, and might have been read wrong.
+    Array length must be a factor of 8!
+    """
+    if arr.size % 8:
+        raise ValueError(
+            f"The length of the given array ({arr.size}) is not a factor of 8."
+        )
+    output = np.zeros(arr.size // 8 * bpp.value, dtype=np.uint8)
+    _byte_confidence_subfunc(arr, bpp.value, output)
     return output
 
 
-@njit("void(uint8[::1], uint8[::1])")
-def _detransform_bpp1_subfunc(arr, out) -> None:
-    """Returns BITS not BYTES, still needs to be packed into the latter."""
+# Every thread of _parallel() handles this many groups of pixels at a time.
+_BLOCK_UNITS = 1 << 16
+
+
+def _parallel(kernel: Callable[..., None], pixels: int, size: int) -> Callable:
+    """Runs {kernel}, which turns every {pixels} pixels into {size} bytes, over blocks
+    of the input in parallel. Within a block, the loop of the kernel is vectorized,
+    which numba does not do for the body of a prange loop itself."""
+
+    @njit("void(uint8[::1], uint8[::1])", parallel=True)
+    def run(arr, out) -> None:
+        units = out.size // size
+        for block in prange(-(units // -_BLOCK_UNITS)):
+            start = block * _BLOCK_UNITS
+            end = min(start + _BLOCK_UNITS, units)
+            kernel(arr[start * pixels : end * pixels], out[start * size : end * size])
+
+    return run
+
+
+@njit
+def _detransform_bpp1_block(arr, out) -> None:
     for i in range(out.size):
-        out[i] = arr[i] >> 7
+        j = i * 8
+        out[i] = (
+            (arr[j] & 128)
+            | ((arr[j + 1] & 128) >> 1)
+            | ((arr[j + 2] & 128) >> 2)
+            | ((arr[j + 3] & 128) >> 3)
+            | ((arr[j + 4] & 128) >> 4)
+            | ((arr[j + 5] & 128) >> 5)
+            | ((arr[j + 6] & 128) >> 6)
+            | ((arr[j + 7] & 128) >> 7)
+        )
 
 
-@njit("void(uint8[::1], uint8[::1])")
-def _detransform_bpp2_subfunc(arr, out) -> None:
+@njit
+def _detransform_bpp2_block(arr, out) -> None:
     for i in range(out.size):
         j = i * 4
         out[i] = (
@@ -65,8 +145,8 @@ def _detransform_bpp2_subfunc(arr, out) -> None:
         )
 
 
-@njit("void(uint8[::1], uint8[::1])")
-def _detransform_bpp3_subfunc(arr, out) -> None:
+@njit
+def _detransform_bpp3_block(arr, out) -> None:
     for i in range(out.size // 3):
         arr_i = i * 8
         out_x3 = (
@@ -83,3 +163,32 @@ def _detransform_bpp3_subfunc(arr, out) -> None:
         out[out_i] = out_x3 >> 16
         out[out_i + 1] = out_x3 >> 8 & 255
         out[out_i + 2] = out_x3 & 255
+
+
+@njit
+def _detransform_bpp4_block(arr, out) -> None:
+    for i in range(out.size):
+        j = i * 2
+        out[i] = (arr[j] & 240) | (arr[j + 1] >> 4)
+
+
+_detransform_bpp1 = _parallel(_detransform_bpp1_block, 8, 1)
+_detransform_bpp2 = _parallel(_detransform_bpp2_block, 4, 1)
+_detransform_bpp3 = _parallel(_detransform_bpp3_block, 8, 3)
+_detransform_bpp4 = _parallel(_detransform_bpp4_block, 2, 1)
+
+
+@njit("void(uint8[::1], int64, uint8[::1])")
+def _byte_confidence_subfunc(arr, bpp, out) -> None:
+    step = 256 >> bpp  # pixels_to_bytes() only looks at the top {bpp} bits
+    top_level = (1 << bpp) - 1
+    for i in range(out.size):
+        confidence = 255
+        for j in range(i * 8 // bpp, (i * 8 + 7) // bpp + 1):
+            level = arr[j] // step
+            rest = arr[j] - level * step
+            if level > 0:
+                confidence = min(confidence, rest)
+            if level < top_level:
+                confidence = min(confidence, step - 1 - rest)
+        out[i] = confidence
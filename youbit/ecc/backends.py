@@ -0,0 +1,233 @@
+"""
+The forward error correction schemes apply_ecc() and remove_ecc() can use.
+
+Every backend turns messages of {message_size} bytes into blocks of {block_size}
+bytes and back. Blocks of zeros are always valid, so the padding at the end of a
+video decodes to zeros as well.
+"""
+from __future__ import annotations
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Annotated, Optional
+
+import numpy as np
+
+from youbit.ecc.creedsolo import RSCodec
+from youbit.settings import ErrorCorrection
+from youbit.types import ndarr_1d_uint8
+
+
+class FECError(Exception):
+    pass
+
+
+class FECBackend(ABC):
+    message_size: int
+    block_size: int
+
+    @abstractmethod
+    def encode_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        """Encodes {data}, a whole number of messages, into 'out'."""
+
+    @abstractmethod
+    def decode_blocks(
+        self,
+        data: ndarr_1d_uint8,
+        out: ndarr_1d_uint8,
+        confidence: Optional[ndarr_1d_uint8] = None,
+    ) -> None:
+        """Decodes {data} into 'out', which has a size of decoded_size(data.size).
+        {confidence} can tell how reliable every byte of {data} is, lower is less reliable.
+        """
+
+    @abstractmethod
+    def strip_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        """Like decode_blocks(), for {data} without any errors: only copies the data out."""
+
+    @abstractmethod
+    def decoded_size(self, data_size: int) -> int:
+        """Returns the size of the output of decode_blocks() for {data_size} bytes."""
+
+
+class ReedSolomonBackend(FECBackend):
+    """Codewords of 255 bytes, of which {ecc_symbols} are parity. Corrects up to
+    {ecc_symbols} / 2 corrupted bytes in every codeword, wherever they are."""
+
+    def __init__(self, ecc_symbols: Annotated[int, "0 < x < 255"]) -> None:
+        self.ecc_symbols = ecc_symbols
+        self.message_size = 255 - ecc_symbols
+        self.block_size = 255
+        self._codec = get_codec(ecc_symbols)
+
+    def encode_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        self._codec.encode_blocks(data, out=out)
+
+    def decode_blocks(
+        self,
+        data: ndarr_1d_uint8,
+        out: ndarr_1d_uint8,
+        confidence: Optional[ndarr_1d_uint8] = None,
+    ) -> None:
+        """With {confidence}, codewords with too many errors get another chance by
+        declaring their least reliable bytes erasures, which cost one ecc symbol
+        instead of two."""
+        self._codec.decode_blocks(data, out=out, confidence=confidence)
+
+    def strip_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        """The code is systematic: every codeword starts with its message."""
+        blocks = data.size // 255
+        message_size = blocks * self.message_size
+        out[:message_size].reshape(-1, self.message_size)[:] = data[
+            : blocks * 255
+        ].reshape(-1, 255)[:, : self.message_size]
+        out[message_size:] = data[blocks * 255 : data.size - self.ecc_symbols]
+
+    def decoded_size(self, data_size: int) -> int:
+        """An incomplete codeword at the end is decoded as a shortened codeword."""
+        trailing_size = data_size % 255
+        return data_size // 255 * self.message_size + max(
+            trailing_size - self.ecc_symbols, 0
+        )
+
+
+class XORParityBackend(FECBackend):
+    """An erasure code over packets of 255 bytes: 251 bytes of data and a CRC32.
+    Blocks hold 255 packets, of which {ecc_symbols} are parity. Packet i belongs to
+    parity class i % {ecc_symbols}, and the last packet of every class holds the XOR
+    of the others. Any packet that fails its CRC can then be restored from the rest
+    of its class, as long as no other packet of that class was lost: any burst of
+    up to {ecc_symbols} consecutive packets is recovered.
+
+    Unlike Reed-Solomon, encoding and decoding take linear time: a CRC and an XOR
+    over every byte. In exchange, a single corrupted byte costs a whole packet.
+    """
+
+    PACKET_SIZE = 255
+    PAYLOAD_SIZE = 251
+    # Stored as crc32(payload) ^ _ZERO_CRC, so a packet of zeros is valid.
+    _ZERO_CRC = zlib.crc32(bytes(PAYLOAD_SIZE))
+
+    def __init__(self, ecc_symbols: Annotated[int, "0 < x < 255"]) -> None:
+        self.ecc_symbols = ecc_symbols
+        self.message_size = (255 - ecc_symbols) * self.PAYLOAD_SIZE
+        self.block_size = 255 * self.PACKET_SIZE
+        self._parity_positions = np.array(
+            [j + ecc_symbols * ((254 - j) // ecc_symbols) for j in range(ecc_symbols)]
+        )
+        self._data_positions = np.setdiff1d(np.arange(255), self._parity_positions)
+
+    def encode_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        packets = out.reshape(-1, 255, self.PACKET_SIZE)
+        payloads = packets[:, :, : self.PAYLOAD_SIZE]
+        payloads[:, self._data_positions] = data.reshape(
+            -1, self.message_size // self.PAYLOAD_SIZE, self.PAYLOAD_SIZE
+        )
+        payloads[:, self._parity_positions] = 0
+        payloads[:, self._parity_positions] = self._class_xor(payloads)
+        packets[:, :, self.PAYLOAD_SIZE :] = (
+            self._checksums(packets)
+            .astype("<u4")
+            .view(np.uint8)
+            .reshape(packets.shape[:2] + (4,))
+        )
+
+    def decode_blocks(
+        self,
+        data: ndarr_1d_uint8,
+        out: ndarr_1d_uint8,
+        confidence: Optional[ndarr_1d_uint8] = None,
+    ) -> None:
+        """An incomplete block at the end can only be padding, and is ignored.
+        {confidence} is not used: the CRC of a packet already tells if it is intact."""
+        blocks = data.size // self.block_size
+        packets = data[: blocks * self.block_size].reshape(-1, 255, self.PACKET_SIZE)
+        payloads = packets[:, :, : self.PAYLOAD_SIZE]
+        stored = np.ascontiguousarray(packets[:, :, self.PAYLOAD_SIZE :])
+        lost = self._checksums(packets) != stored.view("<u4").reshape(blocks, 255)
+
+        message = out.reshape(blocks, -1, self.PAYLOAD_SIZE)
+        message[:] = payloads[:, self._data_positions]
+        if not lost.any():
+            return
+
+        lost_per_class = self._class_sum(lost)
+        if (lost_per_class > 1).any():
+            block = np.nonzero((lost_per_class > 1).any(axis=1))[0][0]
+            raise FECError(f"Too many corrupted packets in block {block} to recover.")
+        class_xor = self._class_xor(payloads)
+        data_index = np.full(255, -1)
+        data_index[self._data_positions] = np.arange(self._data_positions.size)
+        for block, position in zip(*np.nonzero(lost)):
+            if data_index[position] >= 0:
+                message[block, data_index[position]] = (
+                    class_xor[block, position % self.ecc_symbols]
+                    ^ payloads[block, position]
+                )
+
+    def strip_blocks(self, data: ndarr_1d_uint8, out: ndarr_1d_uint8) -> None:
+        blocks = data.size // self.block_size
+        packets = data[: blocks * self.block_size].reshape(-1, 255, self.PACKET_SIZE)
+        out.reshape(blocks, -1, self.PAYLOAD_SIZE)[:] = packets[
+            :, self._data_positions, : self.PAYLOAD_SIZE
+        ]
+
+    def decoded_size(self, data_size: int) -> int:
+        return data_size // self.block_size * self.message_size
+
+    def _class_xor(self, payloads: np.ndarray) -> np.ndarray:
+        """XOR of every parity class, for every block."""
+        result = np.zeros(
+            (payloads.shape[0], self.ecc_symbols, self.PAYLOAD_SIZE), dtype=np.uint8
+        )
+        for start in range(0, 255, self.ecc_symbols):
+            rows = payloads[:, start : start + self.ecc_symbols]
+            result[:, : rows.shape[1]] ^= rows
+        return result
+
+    def _class_sum(self, lost: np.ndarray) -> np.ndarray:
+        """Amount of lost packets in every parity class, for every block."""
+        result = np.zeros((lost.shape[0], self.ecc_symbols), dtype=np.int64)
+        for start in range(0, 255, self.ecc_symbols):
+            rows = lost[:, start : start + self.ecc_symbols]
+            result[:, : rows.shape[1]] += rows
+        return result
+
+    def _checksums(self, packets: np.ndarray) -> np.ndarray:
+        """The checksum of the payload of every packet, for every block."""
+        rows = packets.reshape(-1, self.PACKET_SIZE)
+        checksums = np.fromiter(
+            (zlib.crc32(row[: self.PAYLOAD_SIZE]) for row in rows),
+            dtype=np.uint32,
+            count=rows.shape[0],
+        )
+        return checksums.reshape(packets.shape[:2]) ^ np.uint32(self._ZERO_CRC)
+
+
+_BACKENDS = {
+    ErrorCorrection.REED_SOLOMON: ReedSolomonBackend,
+    ErrorCorrection.XOR_PARITY: XORParityBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend(
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> FECBackend:
+    """Returns the backend for the given parameters, shared by the whole process."""
+    return _BACKENDS[error_correction](ecc_symbols)
+
+
+@lru_cache(maxsize=None)
+def get_codec(
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    fcr: int = 0,
+    generator: int = 2,
+    prim: int = 0x11D,
+) -> RSCodec:
+    """Returns the RSCodec for the given parameters, shared by the whole process.
+    Setting up a codec means building its generator polynomial and lookup tables,
+    so this only happens once instead of for every chunk of data.
+    """
+    return RSCodec(ecc_symbols, fcr=fcr, generator=generator, prim=prim)
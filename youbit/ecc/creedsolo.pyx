@@ -89,6 +89,7 @@ from cython.parallel import parallel, prange
 
 import itertools
 from cython.view cimport array as cvarray
+from libc.string cimport memcpy, memset
 
 
 ################### INIT and stuff ###################
@@ -111,6 +112,8 @@ ctypedef unsigned char uint8_t # equivalent to (but works with Microsoft C compi
 cdef uint8_t[::1] gf_exp = bytearray([1] * 512) # For efficiency, gf_exp[] has size 2*GF_SIZE, so that a simple multiplication of two numbers can be resolved without calling % field_charac
 cdef uint8_t[::1] gf_log = bytearray([0] * 256)
 cdef int field_charac = int(2**8 - 1)
+_tables_key = None # (prim, generator, c_exp) the look-up tables above were last initialized with
+_generator_polys_cache = {} # see rs_generator_poly_all_cached()
 
 
 ################### GALOIS FIELD ELEMENTS MATHS ###################
@@ -190,7 +193,8 @@ def init_tables(prim=0x11d, generator=2, c_exp=8):
     # note that the choice of generator or prime polynomial doesn't matter very much: any two finite fields of size p^n have identical structure, even if they give the individual elements different names (ie, the coefficients of the codeword will be different, but the final result will be the same: you can always correct as many errors/erasures with any choice for those parameters). That's why it makes sense to refer to all the finite fields, and all decoders based on Reed-Solomon, of size p^n as one concept: GF(p^n). It can however impact sensibly the speed (because some parameters will generate sparser tables).
     # c_exp is the exponent for the field's characteristic GF(2^c_exp)
 
-    global gf_exp, gf_log, field_charac
+    global gf_exp, gf_log, field_charac, _tables_key
+    _tables_key = (prim, generator, c_exp)
     field_charac = int(2**c_exp - 1)
     gf_exp = bytearray(field_charac * 2) # anti-log (exponential) table. The first two elements will always be [GF256int(1), generator]
     gf_log = bytearray(field_charac+1) # log table, log[0] is impossible and thus unused
@@ -215,6 +219,11 @@ def init_tables(prim=0x11d, generator=2, c_exp=8):
 
     return [gf_log, gf_exp]
 
+def ensure_tables(prim=0x11d, generator=2, c_exp=8):
+    '''Same as init_tables(), but only recomputes the look-up tables if they were last initialized with different parameters.'''
+    if _tables_key != (prim, generator, c_exp):
+        init_tables(prim, generator, c_exp)
+
 cpdef uint8_t gf_add(uint8_t x, uint8_t y):
     return x ^ y
 
@@ -413,6 +422,13 @@ def rs_generator_poly(nsym, fcr=0, generator=2):
         g = gf_poly_mul(g, [1, gf_pow(generator, i+fcr)])
     return bytearray(g)
 
+def rs_generator_poly_all_cached(max_nsym, fcr=0, generator=2):
+    '''Same as rs_generator_poly_all(), but computed only once per set of parameters (and look-up tables) in this process. The returned dict is shared, do not modify it.'''
+    key = (max_nsym, fcr, generator, _tables_key)
+    if key not in _generator_polys_cache:
+        _generator_polys_cache[key] = rs_generator_poly_all(max_nsym, fcr, generator)
+    return _generator_polys_cache[key]
+
 def rs_generator_poly_all(max_nsym, fcr=0, generator=2):
     '''Generate all irreducible generator polynomials up to max_nsym (usually you can use n, the length of the message+ecc). Very useful to reduce processing time if you want to encode using variable schemes and nsym rates.'''
     g_all = {}
@@ -430,7 +446,11 @@ def rs_encode_msg(msg_in, int nsym, int fcr=0, int generator=2, gen=None):
     # >> cdef uint8_t[::1] msg_out = bytearray(msg_in_t) + bytearray(gen_t.shape[0]-1)
     # >> ValueError : negative count
 
-    cdef uint8_t[::1] msg_in_t = bytearray(msg_in) # have to copy, unfortunately - can't make a memory view from a read only object
+    cdef const uint8_t[::1] msg_in_t
+    try:
+        msg_in_t = msg_in # const memoryviews also accept read only objects (bytes), so no copy is needed
+    except (TypeError, ValueError):
+        msg_in_t = bytearray(msg_in) # lists of ints or non contiguous buffers still have to be copied
     #cdef uint8_t[::1] gen_t = array.array('i',gen) # convert list to array
     cdef uint8_t[::1] gen_t = gen
 
@@ -443,7 +463,7 @@ def rs_encode_msg(msg_in, int nsym, int fcr=0, int generator=2, gen=None):
 
     with nogil:
         # Precompute the logarithm of every items in the generator
-        for j in prange(gen_t.shape[0]):
+        for j in xrange(gen_t.shape[0]):
             lgen[j] = gf_log[gen_t[j]]
 
         # Extended synthetic division main loop
@@ -453,13 +473,79 @@ def rs_encode_msg(msg_in, int nsym, int fcr=0, int generator=2, gen=None):
             if coef != 0: # log(0) is undefined, so we need to manually check for this case. There's no need to check the divisor here because we know it can't be 0 since we generated it.
                 lcoef = gf_log[coef] # precaching
 
-                for j in prange(1, gen_t.shape[0]): # in synthetic division, we always skip the first coefficient of the divisior, because it's only used to normalize the dividend coefficient (which is here useless since the divisor, the generator polynomial, is always monic)
+                for j in xrange(1, gen_t.shape[0]): # in synthetic division, we always skip the first coefficient of the divisior, because it's only used to normalize the dividend coefficient (which is here useless since the divisor, the generator polynomial, is always monic)
                     msg_out[i + j] ^= gf_exp[lcoef + lgen[j]] # optimization, equivalent to gf_mul(gen[j], msg_out[i]) and we just substract it to msg_out[i+j] (but since we are in GF256, it's equivalent to an addition and to an XOR). In other words, this is simply a "multiply-accumulate operation"
 
     # Recopy the original message bytes (overwrites the part where the quotient was computed)
     msg_out[:msg_in_t.shape[0]] = msg_in_t # equivalent to c = mprime - b, where mprime is msg_in padded with [0]*nsym
     return bytearray(msg_out)
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void _rs_encode_block(const uint8_t* msg_in, uint8_t* msg_out, int k, int nsym, const uint8_t* gen_mul) noexcept nogil:
+    '''Encodes a single message of k symbols into msg_out (k + nsym symbols), without the GIL.
+    This is the LFSR form of the synthetic division in rs_encode_msg(): the remainder is kept in a small register and shifted along the message, and gen_mul holds the product of every possible feedback value with every generator coefficient, so the inner loop is a plain shift-and-xor.'''
+    cdef int i, j
+    cdef const uint8_t* row
+    cdef uint8_t rem[256]
+    memset(rem, 0, nsym)
+    for i in xrange(k):
+        row = gen_mul + (msg_in[i] ^ rem[0]) * nsym
+        for j in xrange(nsym - 1):
+            rem[j] = rem[j + 1] ^ row[j]
+        rem[nsym - 1] = row[nsym - 1]
+    memcpy(msg_out, msg_in, k)
+    memcpy(msg_out + k, rem, nsym)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+def rs_generator_mul_table(gen):
+    '''Multiplication table of every possible feedback value (rows) with every coefficient of the generator polynomial except its monic first one (columns), as used by rs_encode_msg_blocks().'''
+    cdef const uint8_t[::1] gen_t = bytearray(gen)
+    cdef int nsym = gen_t.shape[0] - 1
+    cdef int c, j
+    cdef uint8_t[::1] gen_mul = bytearray(256 * nsym)
+    for c in xrange(1, 256):
+        for j in xrange(nsym):
+            gen_mul[c * nsym + j] = gf_exp[gf_log[c] + gf_log[gen_t[j + 1]]]
+    return gen_mul
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+def rs_encode_msg_blocks(const uint8_t[::1] msg_in, int nsym, gen, int nsize=255, gen_mul=None, out=None):
+    '''Reed-Solomon encoding of many messages at once. msg_in must consist of consecutive messages of k = nsize - nsym symbols, so its length must be a multiple of k.
+    Every message is an independent codeword, so they are encoded in parallel (OpenMP) with the GIL released. The output is byte-identical to calling rs_encode_msg() on every message and concatenating the results.
+    gen_mul can be given to skip computing rs_generator_mul_table(gen) again.
+    msg_in can be any contiguous buffer (bytes, memoryview, numpy array...) and is never copied. The codewords are written into out if given (any writable buffer of exactly the right size), else into a new bytearray.'''
+    # IMPORTANT: like rs_encode_msg(), gen must always be provided.
+    if len(gen) - 1 != nsym:
+        raise ValueError("Generator polynomial does not match the number of ecc symbols (%i)" % nsym)
+    cdef int k = nsize - nsym
+    if nsym <= 0 or k <= 0 or nsize > field_charac:
+        raise ValueError("Invalid codeword size (%i) for %i ecc symbols, maximum is %i" % (nsize, nsym, field_charac))
+    if msg_in.shape[0] % k:
+        raise ValueError("Input length (%i) is not a multiple of the message length (%i)" % (msg_in.shape[0], k))
+
+    cdef Py_ssize_t blocks = msg_in.shape[0] // k
+    msg_out = bytearray(blocks * nsize) if out is None else out
+    cdef uint8_t[::1] msg_out_t = msg_out
+    if msg_out_t.shape[0] != blocks * nsize:
+        raise ValueError("Output buffer has the wrong size (%i instead of %i)" % (msg_out_t.shape[0], blocks * nsize))
+    if not blocks:
+        return msg_out
+    cdef const uint8_t[::1] gen_mul_t = rs_generator_mul_table(gen) if gen_mul is None else gen_mul
+
+    cdef Py_ssize_t b
+    cdef const uint8_t* in_p = &msg_in[0]
+    cdef uint8_t* out_p = &msg_out_t[0]
+    cdef const uint8_t* gen_mul_p = &gen_mul_t[0]
+    for b in prange(blocks, nogil=True, schedule="static"):
+        _rs_encode_block(in_p + b * k, out_p + b * nsize, k, nsym, gen_mul_p)
+    return msg_out
+
 ####### Attempt at precomputing multiplication and addition table to speedup encoding even more, but it's actually a bit slower... ###########
 gf_mul_arr = [bytearray(256) for _ in xrange(256)]
 gf_add_arr = [bytearray(256) for _ in xrange(256)]
@@ -793,6 +879,223 @@ def rs_check(msg, nsym, fcr=0, generator=2):
     return ( max(rs_calc_syndromes(msg, nsym, fcr, generator)) == 0 )
 
 
+################### BATCHED REED-SOLOMON DECODING ###################
+# The functions below decode many codewords at once without holding the GIL. They implement the same errors-only decoding as rs_correct_msg()
+# (syndromes, Berlekamp-Massey, Chien search and Forney), but on raw pointers and fixed size buffers, so every codeword can be processed in parallel.
+# Syndromes are computed first: when they are all zero (by far the most common case) the codeword is simply copied, skipping everything else.
+
+cdef inline uint8_t _gf_mul_t(uint8_t x, uint8_t y, const uint8_t* exp_t, const uint8_t* log_t) noexcept nogil:
+    if x == 0 or y == 0:
+        return 0
+    return exp_t[log_t[x] + log_t[y]]
+
+cdef inline uint8_t _gf_div_t(uint8_t x, uint8_t y, const uint8_t* exp_t, const uint8_t* log_t, int charac) noexcept nogil:
+    if x == 0:
+        return 0
+    return exp_t[log_t[x] + charac - log_t[y]]
+
+cdef inline uint8_t _gf_alpha_pow(long power, int lg, const uint8_t* exp_t, int charac) noexcept nogil:
+    '''Returns generator**power, where lg is the logarithm of the generator. Negative powers are allowed.'''
+    cdef long e = (power * lg) % charac
+    if e < 0:
+        e += charac
+    return exp_t[e]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline bint _rs_calc_syndromes_t(const uint8_t* msg, int n, int nsym, const uint8_t* synd_mul, uint8_t* synd) noexcept nogil:
+    '''Computes the nsym syndromes of a codeword (without the leading 0 of rs_calc_syndromes()) and returns whether any of them is non-zero.
+    synd_mul holds a multiplication table for every evaluation point, so the Horner steps of all syndromes are simple lookups.'''
+    cdef int i, p
+    cdef uint8_t c, nonzero = 0
+    memset(synd, 0, nsym)
+    for p in xrange(n):
+        c = msg[p]
+        for i in xrange(nsym):
+            synd[i] = synd_mul[(i << 8) + synd[i]] ^ c
+    for i in xrange(nsym):
+        nonzero |= synd[i]
+    return nonzero != 0
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef int _rs_decode_block(const uint8_t* msg_in, uint8_t* msg_out, int n, int nsym, int fcr, int lg, const uint8_t* synd_mul, const uint8_t* exp_t, const uint8_t* log_t, int charac) noexcept nogil:
+    '''Decodes a single codeword of n symbols, writing its n - nsym message symbols to msg_out.
+    Returns 0 if the codeword was clean, 1 if it was corrected, and -1 if it could not be corrected (msg_out is then left untouched).'''
+    cdef uint8_t cw[256]
+    cdef uint8_t synd[256]
+    cdef uint8_t err_loc[256]
+    cdef uint8_t old_loc[256]
+    cdef uint8_t tmp_loc[256]
+    cdef uint8_t err_eval[256]
+    cdef int err_pos[256]
+    cdef int i, j, r, p, deg, L = 0, m = 1, count = 0
+    cdef uint8_t delta, scale, b = 1, x_inv, y, num, den
+
+    if not _rs_calc_syndromes_t(msg_in, n, nsym, synd_mul, synd):
+        memcpy(msg_out, msg_in, n - nsym)
+        return 0
+
+    # Berlekamp-Massey: find the error locator polynomial (lowest degree first here)
+    memset(err_loc, 0, nsym + 1)
+    memset(old_loc, 0, nsym + 1)
+    err_loc[0] = old_loc[0] = 1
+    for r in xrange(nsym):
+        delta = synd[r]
+        for i in xrange(1, L + 1):
+            delta ^= _gf_mul_t(err_loc[i], synd[r - i], exp_t, log_t)
+        if delta == 0:
+            m += 1
+            continue
+        scale = _gf_div_t(delta, b, exp_t, log_t, charac)
+        if 2 * L <= r:
+            memcpy(tmp_loc, err_loc, nsym + 1)
+            for i in xrange(m, nsym + 1):
+                err_loc[i] ^= _gf_mul_t(scale, old_loc[i - m], exp_t, log_t)
+            L = r + 1 - L
+            memcpy(old_loc, tmp_loc, nsym + 1)
+            b = delta
+            m = 1
+        else:
+            for i in xrange(m, nsym + 1):
+                err_loc[i] ^= _gf_mul_t(scale, old_loc[i - m], exp_t, log_t)
+            m += 1
+    if 2 * L > nsym:
+        return -1
+
+    # Chien search: the error locator evaluates to 0 at the inverse of every error location
+    for p in xrange(n):
+        x_inv = _gf_alpha_pow(-(n - 1 - p), lg, exp_t, charac)
+        y = 0
+        for i in xrange(L, -1, -1):
+            y = _gf_mul_t(y, x_inv, exp_t, log_t) ^ err_loc[i]
+        if y == 0:
+            if count == L:
+                return -1
+            err_pos[count] = p
+            count += 1
+    if count != L:
+        return -1
+
+    # Forney: error evaluator Omega(x) = S(x) * Lambda(x) mod x^nsym, then compute each magnitude
+    for i in xrange(nsym):
+        err_eval[i] = 0
+        deg = i if i < L else L
+        for j in xrange(deg + 1):
+            err_eval[i] ^= _gf_mul_t(err_loc[j], synd[i - j], exp_t, log_t)
+    memcpy(cw, msg_in, n)
+    for j in xrange(count):
+        p = n - 1 - err_pos[j]  # coefficient degree of this error
+        x_inv = _gf_alpha_pow(-p, lg, exp_t, charac)
+        num = 0
+        for i in xrange(nsym - 1, -1, -1):
+            num = _gf_mul_t(num, x_inv, exp_t, log_t) ^ err_eval[i]
+        # Formal derivative of the error locator: only the odd terms remain in GF(2^p)
+        den = 0
+        for i in xrange(L, 0, -1):
+            if i & 1:
+                den ^= _gf_mul_t(err_loc[i], _gf_alpha_pow(-p * (i - 1), lg, exp_t, charac), exp_t, log_t)
+        if den == 0:
+            return -1
+        y = _gf_div_t(num, den, exp_t, log_t, charac)
+        cw[err_pos[j]] ^= _gf_mul_t(_gf_alpha_pow(p * (1 - fcr), lg, exp_t, charac), y, exp_t, log_t)
+
+    # Check that the codeword is fully repaired
+    if _rs_calc_syndromes_t(cw, n, nsym, synd_mul, synd):
+        return -1
+    memcpy(msg_out, cw, n - nsym)
+    return 1
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+def rs_syndrome_mul_table(int nsym, int fcr=0, int generator=2):
+    '''One multiplication table (of 256 entries) for every syndrome evaluation point generator**(i + fcr), as used by rs_correct_msg_blocks().'''
+    cdef int i, y
+    cdef uint8_t point
+    cdef uint8_t[::1] synd_mul = bytearray(nsym * 256)
+    for i in xrange(nsym):
+        point = gf_pow(generator, i + fcr)
+        for y in xrange(1, 256):
+            synd_mul[(i << 8) + y] = gf_mul(y, point)
+    return synd_mul
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+def rs_correct_msg_blocks(const uint8_t[::1] msg_in, int nsym, int nsize=255, int fcr=0, int generator=2, synd_mul=None, out=None, confidence=None):
+    '''Repairs many codewords at once and returns the concatenated messages, like RSCodec.decode()[0].
+    Complete codewords of nsize symbols are decoded in parallel (OpenMP) with the GIL released. A codeword that cannot be corrected there,
+    and a possibly shorter codeword at the very end, go through rs_correct_msg() instead, which raises a ReedSolomonError if it cannot repair them either.
+    synd_mul can be given to skip computing rs_syndrome_mul_table() again.
+    Like rs_encode_msg_blocks(), msg_in is never copied and the messages are written into out if given, else into a new bytearray.
+    confidence can be a buffer as long as msg_in, telling how reliable every symbol is (lower is less reliable). Codewords the fast decoder cannot correct
+    then get another chance with rs_correct_msg_soft().'''
+    cdef int k = nsize - nsym
+    if nsym <= 0 or k <= 0 or nsize > field_charac:
+        raise ValueError("Invalid codeword size (%i) for %i ecc symbols, maximum is %i" % (nsize, nsym, field_charac))
+
+    cdef Py_ssize_t blocks = msg_in.shape[0] // nsize
+    cdef Py_ssize_t tail = msg_in.shape[0] - blocks * nsize
+    msg_out = bytearray(blocks * k + max(tail - nsym, 0)) if out is None else out
+    cdef uint8_t[::1] msg_out_t = msg_out
+    if msg_out_t.shape[0] != blocks * k + max(tail - nsym, 0):
+        raise ValueError("Output buffer has the wrong size (%i instead of %i)" % (msg_out_t.shape[0], blocks * k + max(tail - nsym, 0)))
+    if confidence is not None and len(confidence) != msg_in.shape[0]:
+        raise ValueError("Confidence buffer has the wrong size (%i instead of %i)" % (len(confidence), msg_in.shape[0]))
+    # Typed, so assigning it to a slice of msg_out_t copies it instead of broadcasting a scalar
+    cdef const uint8_t[::1] repaired
+    if tail:
+        repaired = _rs_correct_msg_any(msg_in[blocks * nsize:], nsym, fcr, generator, confidence, blocks * nsize)
+        msg_out_t[blocks * k:] = repaired
+    if not blocks:
+        return msg_out
+
+    cdef const uint8_t[::1] synd_mul_t = rs_syndrome_mul_table(nsym, fcr, generator) if synd_mul is None else synd_mul
+    cdef int lg = gf_log[generator]
+
+    cdef signed char[::1] status = cvarray(shape=(blocks,), itemsize=1, format="b")
+    cdef Py_ssize_t b
+    cdef const uint8_t* in_p = &msg_in[0]
+    cdef uint8_t* out_p = &msg_out_t[0]
+    cdef const uint8_t* synd_mul_p = &synd_mul_t[0]
+    cdef const uint8_t* exp_p = &gf_exp[0]
+    cdef const uint8_t* log_p = &gf_log[0]
+    cdef int charac = field_charac
+    for b in prange(blocks, nogil=True, schedule="guided"):
+        status[b] = _rs_decode_block(in_p + b * nsize, out_p + b * k, nsize, nsym, fcr, lg, synd_mul_p, exp_p, log_p, charac)
+
+    # Codewords the fast decoder gave up on get a second chance with the reference implementation (and its exceptions)
+    for b in xrange(blocks):
+        if status[b] < 0:
+            repaired = _rs_correct_msg_any(msg_in[b * nsize:(b + 1) * nsize], nsym, fcr, generator, confidence, b * nsize)
+            msg_out_t[b * k:(b + 1) * k] = repaired
+    return msg_out
+
+cdef _rs_correct_msg_any(msg_in, int nsym, int fcr, int generator, confidence, Py_ssize_t start):
+    '''rs_correct_msg(), or rs_correct_msg_soft() with confidence[start:] if it is given. Returns only the message.'''
+    if confidence is None:
+        return rs_correct_msg(msg_in, nsym, fcr=fcr, generator=generator)[0]
+    return rs_correct_msg_soft(msg_in, nsym, confidence[start:start + len(msg_in)], fcr=fcr, generator=generator)[0]
+
+def rs_correct_msg_soft(msg_in, nsym, confidence, fcr=0, generator=2):
+    '''Generalized minimum distance decoding: like rs_correct_msg(), but when there are too many errors, the 2, 4, 6... least reliable symbols
+    according to confidence (lower is less reliable, one value per symbol) are declared erasures, which cost only one ecc symbol instead of two.
+    The first attempt that repairs the message within the capacity of the code (2 * errors + erasures <= nsym) wins.
+    At most nsym / 2 symbols are erased: with more, too little redundancy is left to tell a wrong codeword from the right one, and
+    miscorrections quickly outnumber the repairs.'''
+    order = sorted(xrange(len(msg_in)), key=bytes(confidence).__getitem__)
+    for erasures in xrange(0, nsym // 2 + 1, 2):
+        try:
+            result = rs_correct_msg(msg_in, nsym, fcr=fcr, generator=generator, erase_pos=order[:erasures] or None)
+        except ReedSolomonError:
+            continue
+        if 2 * (len(result[2]) - erasures) + erasures <= nsym:
+            return result
+    raise ReedSolomonError("Could not correct message, even with erasures")
+
+
 #===================================================================================================
 # API
 #===================================================================================================
@@ -823,14 +1126,19 @@ class RSCodec(object):
         self.c_exp = c_exp # exponent of the field's characteristic. This both defines the maximum value per symbol and the maximum length of one chunk. By default it's GF(2^8), do not change if you're not sure what it means.
 
         # Initialize the look-up tables for easy and quick multiplication/division
-        init_tables(prim, generator, c_exp)
+        ensure_tables(prim, generator, c_exp)
         # Prepare the generator polynomials (because in this cython implementation, the encoding function does not automatically build the generator polynomial if missing)
-        self.g_all = rs_generator_poly_all(nsize, fcr=fcr, generator=generator)
+        self.g_all = rs_generator_poly_all_cached(nsize, fcr=fcr, generator=generator)
+        # Precompute the tables of the batched encoder and decoder once, as contiguous memoryviews
+        self.gen = self.g_all[nsym]
+        self.gen_mul = rs_generator_mul_table(self.gen) if nsym > 0 else None
+        self.synd_mul = rs_syndrome_mul_table(nsym, fcr, generator)
 
     def encode(self, data):
         '''Encode a message (ie, add the ecc symbols) using Reed-Solomon, whatever the length of the message because we use chunking'''
         if isinstance(data, str):
             data = bytearray(data, "latin-1")
+        ensure_tables(self.prim, self.generator, self.c_exp)
         chunk_size = self.nsize - self.nsym
         enc = bytearray()
         for i in xrange(0, len(data), chunk_size):
@@ -838,11 +1146,18 @@ class RSCodec(object):
             enc.extend(rs_encode_msg(chunk, self.nsym, fcr=self.fcr, generator=self.generator, gen=self.g_all[self.nsym]))
         return enc
 
+    def encode_blocks(self, data, out=None):
+        '''Encode a message whose length is a multiple of (nsize - nsym). All chunks are encoded in parallel without the GIL, the result is identical to encode().
+        data can be any contiguous buffer and is not copied, the result is written into out if given.'''
+        ensure_tables(self.prim, self.generator, self.c_exp)
+        return rs_encode_msg_blocks(data, self.nsym, self.gen, self.nsize, self.gen_mul, out)
+
     def decode(self, data, erase_pos=None, only_erasures=False):
         '''Repair a message, whatever its size is, by using chunking'''
         # erase_pos is a list of positions where you know (or greatly suspect at least) there is an erasure (ie, wrong character but you know it's at this position). Just input the list of all positions you know there are errors, and this method will automatically split the erasures positions to attach to the corresponding data chunk.
         if isinstance(data, str):
             data = bytearray(data, "latin-1")
+        ensure_tables(self.prim, self.generator, self.c_exp)
         dec = bytearray()
         dec_full = bytearray()
         errata_pos_all = bytearray()
@@ -863,6 +1178,12 @@ class RSCodec(object):
             errata_pos_all.extend(errata_pos)
         return dec, dec_full, errata_pos_all
 
+    def decode_blocks(self, data, out=None, confidence=None):
+        '''Repair a message of any size and return only the decoded message (without the ecc symbols). Clean codewords are detected by their syndromes and skipped, all others are corrected in parallel without the GIL.
+        data can be any contiguous buffer and is not copied, the result is written into out if given. See rs_correct_msg_blocks() for confidence.'''
+        ensure_tables(self.prim, self.generator, self.c_exp)
+        return rs_correct_msg_blocks(data, self.nsym, self.nsize, self.fcr, self.generator, self.synd_mul, out, confidence)
+
     def check(self, data, nsym=None):
         '''Check if a message+ecc stream is not corrupted (or fully repaired). Note: may return a wrong result if number of errors > nsym.'''
         if not nsym:
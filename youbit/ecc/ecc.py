@@ -1,39 +1,188 @@
 """
-Provides an interface for creedsolo.pyx. Error correction is applied and removed here.
+Error correction is applied and removed here, by one of the backends in backends.py.
+Reed-Solomon (creedsolo.pyx) is used by default.
+
+With an interleave depth of N, the bytes of every N consecutive codewords (the blocks
+of the backend) are spread out: the output holds the first byte of each of those N
+codewords, then their second byte, and so on. A burst of corrupted bytes (one blocky
+artifact in the video) is then split over N codewords, instead of wiping out one.
 """
-from typing import Annotated
-from typing import Union
 
-from youbit.ecc.creedsolo import RSCodec
+from typing import Annotated, Optional
+
+import numpy as np
+
+from youbit.ecc.backends import get_backend, get_codec
+from youbit.settings import ErrorCorrection
+from youbit.types import bytes_like, ndarr_1d_uint8
 
 
 def apply_ecc(
-    data: Union[bytes, bytearray], ecc_symbols: Annotated[int, "0 < x < 255"]
-) -> bytearray:
-    """Encodes a bytes object using reed-solomon error correction. Galois field is GF(256).
+    data: bytes_like,
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+    out: Optional[ndarr_1d_uint8] = None,
+) -> ndarr_1d_uint8:
+    """Encodes a bytes object using the given error correction, reed-solomon by default.
+    Every codeword is independent, so reed-solomon encodes them across all cores.
+    The input is never copied. The codewords are written into 'out' if given, which must
+    have a size of exactly encoded_size(len(data), ecc_symbols, ...).
     BEWARE: nulls (zeros) can be added if the input is not a factor of
-    (255 - {ecc_symbols})!
+    message_size(ecc_symbols, ...) * {interleave_depth}!
     This is only acceptable at the very end of a file.
     """
-    if mod := len(data) % (255 - ecc_symbols):
-        bytes_needed = (255 - ecc_symbols) - mod
-        data = _add_trailing_bytes(data, bytes_needed)
+    data = np.frombuffer(data, dtype=np.uint8)
+    if out is None:
+        out = np.empty(
+            encoded_size(data.size, ecc_symbols, interleave_depth, error_correction),
+            dtype=np.uint8,
+        )
+    codewords = out if interleave_depth == 1 else np.empty_like(out)
 
-    return RSCodec(ecc_symbols).encode(data)  # type: ignore
+    backend = get_backend(ecc_symbols, error_correction)
+    message_size, block_size = backend.message_size, backend.block_size
+    full_size = data.size - (data.size % message_size)
+    full_blocks_size = full_size // message_size * block_size
+    backend.encode_blocks(data[:full_size], codewords[:full_blocks_size])
+    if full_size != data.size:
+        trailing_message = _add_trailing_bytes(data[full_size:], message_size)
+        backend.encode_blocks(
+            trailing_message,
+            codewords[full_blocks_size : full_blocks_size + block_size],
+        )
+        full_blocks_size += block_size
+    # Zeros are a valid codeword, to fill up the last group.
+    codewords[full_blocks_size:] = 0
 
+    if interleave_depth > 1:
+        _interleave(codewords, interleave_depth, block_size, out)
+    return out
 
-def _add_trailing_bytes(data: Union[bytes, bytearray], byte_count: int) -> bytearray:
-    data_bytearray = bytearray(data)
-    trailing_bytes = bytearray([0] * byte_count)
-    data_bytearray.extend(trailing_bytes)
-    return data_bytearray
+
+def _add_trailing_bytes(data: ndarr_1d_uint8, size: int) -> ndarr_1d_uint8:
+    """Only ever used on the last, incomplete message: padding it is
+    a lot cheaper than copying the whole input."""
+    padded_data = np.zeros(size, dtype=np.uint8)
+    padded_data[: data.size] = data
+    return padded_data
 
 
 def remove_ecc(
-    data: Union[bytes, bytearray], ecc_symbols_used: Annotated[int, "0 < x < 255"]
-) -> bytearray:
+    data: bytes_like,
+    ecc_symbols_used: Annotated[int, "0 < x < 255"],
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+    out: Optional[ndarr_1d_uint8] = None,
+    confidence: Optional[ndarr_1d_uint8] = None,
+) -> ndarr_1d_uint8:
     """Removes error correction from bytes object.
+    Codewords without errors are only checked, all others are corrected across all cores.
+    The input is never copied. The result is written into 'out' if given, which must
+    have a size of exactly decoded_size(len(data), ecc_symbols_used, ...).
     BEWARE: if processing data in chunks, only pass data with a length
-    that is a factor of 255, with the exception of the very last chunk!
+    that is a factor of block_size(...) * {interleave_depth}, with the exception
+    of the very last chunk!
+    When interleaving, an incomplete group of codewords at the very end can only be
+    padding of the video, and is ignored.
+    {confidence} can tell how reliable every byte of {data} is (see
+    detransform.byte_confidence()), which helps to repair the worst codewords.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if out is None:
+        out = np.empty(
+            decoded_size(
+                data.size, ecc_symbols_used, interleave_depth, error_correction
+            ),
+            dtype=np.uint8,
+        )
+    backend = get_backend(ecc_symbols_used, error_correction)
+    if interleave_depth > 1:
+        data = _deinterleave(data, interleave_depth, backend.block_size)
+        if confidence is not None:
+            confidence = _deinterleave(confidence, interleave_depth, backend.block_size)
+    backend.decode_blocks(data, out, confidence)
+    return out
+
+
+def strip_ecc(
+    data: bytes_like,
+    ecc_symbols_used: Annotated[int, "0 < x < 255"],
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+    out: Optional[ndarr_1d_uint8] = None,
+) -> ndarr_1d_uint8:
+    """Returns what remove_ecc() would for the same arguments, if {data} held no errors.
+    Nothing is checked or corrected, the data is only copied out of the codewords:
+    use this when {data} is already known to be intact.
     """
-    return RSCodec(ecc_symbols_used).decode(data)[0]  # type: ignore
+    data = np.frombuffer(data, dtype=np.uint8)
+    if out is None:
+        out = np.empty(
+            decoded_size(
+                data.size, ecc_symbols_used, interleave_depth, error_correction
+            ),
+            dtype=np.uint8,
+        )
+    backend = get_backend(ecc_symbols_used, error_correction)
+    if interleave_depth > 1:
+        data = _deinterleave(data, interleave_depth, backend.block_size)
+    backend.strip_blocks(data, out)
+    return out
+
+
+def _interleave(
+    codewords: ndarr_1d_uint8, depth: int, block_size: int, out: ndarr_1d_uint8
+) -> ndarr_1d_uint8:
+    """Transposes every group of {depth} consecutive codewords into 'out'."""
+    groups = codewords.reshape(-1, depth, block_size)
+    out.reshape(-1, block_size, depth)[:] = groups.transpose(0, 2, 1)
+    return out
+
+
+def _deinterleave(data: ndarr_1d_uint8, depth: int, block_size: int) -> ndarr_1d_uint8:
+    """Reverses _interleave(), dropping an incomplete group at the end."""
+    group_size = block_size * depth
+    groups = data[: data.size - data.size % group_size].reshape(-1, block_size, depth)
+    return np.ascontiguousarray(groups.transpose(0, 2, 1)).ravel()
+
+
+def message_size(
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> int:
+    """Returns the amount of data bytes held by one codeword."""
+    return get_backend(ecc_symbols, error_correction).message_size
+
+
+def block_size(
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> int:
+    """Returns the size of one codeword."""
+    return get_backend(ecc_symbols, error_correction).block_size
+
+
+def encoded_size(
+    data_size: int,
+    ecc_symbols: Annotated[int, "0 < x < 255"],
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> int:
+    """Returns the size of the output of apply_ecc() for an input of {data_size} bytes."""
+    backend = get_backend(ecc_symbols, error_correction)
+    group_message_size = backend.message_size * interleave_depth
+    return -(data_size // -group_message_size) * backend.block_size * interleave_depth
+
+
+def decoded_size(
+    data_size: int,
+    ecc_symbols_used: Annotated[int, "0 < x < 255"],
+    interleave_depth: int = 1,
+    error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+) -> int:
+    """Returns the size of the output of remove_ecc() for an input of {data_size} bytes."""
+    backend = get_backend(ecc_symbols_used, error_correction)
+    if interleave_depth > 1:
+        data_size -= data_size % (backend.block_size * interleave_depth)
+    return backend.decoded_size(data_size)
@@ -2,20 +2,25 @@
 The main API of YouBit.
 """
 from __future__ import annotations
-from typing import Union
-import gzip
+from typing import Generator, Union
+import hashlib
+from functools import partial
 import shutil
 import os
 from pathlib import Path
 
-from youbit import util
-from youbit.ecc.ecc import apply_ecc
+from youbit import pipeline, util
+from youbit.compression import compress_chunks, is_compressible, max_compressed_size
+from youbit.checksums import ChecksumWriter, region_size
+from youbit.ecc.ecc import apply_ecc, block_size, encoded_size, message_size
 from youbit.metadata import Metadata
-from youbit.settings import Settings
+from youbit.pilot import pilot_frame
+from youbit.settings import Compression, Settings
 from youbit.tempdir import TempDir
-from youbit.transform import bytes_to_pixels
+from youbit.transform import bytes_to_frames, frame_capacity
+from youbit.types import bytes_like, ndarr_1d_uint8
 from youbit.upload import Uploader
-from youbit.video import VideoEncoder
+from youbit.video import SegmentedVideoEncoder, VideoEncoder
 
 
 class Encoder:
@@ -32,11 +37,14 @@ class Encoder:
         self._settings = settings
         self._metadata = Metadata(
             filename=str(self._input_file.name),
-            md5_hash=util.get_md5(self._input_file),
             settings=self._settings,
         )
+        # How long every stage of the last encoding took, see pipeline.Timings
+        self.timings = pipeline.Timings()
 
     def encode_and_upload(self) -> str:
+        if self._settings.lossless:
+            raise ValueError("Lossless videos are only meant for local use.")
         with TempDir() as tempdir:
             video_temp_path = tempdir.path / "video.mp4"
             self._encode(video_temp_path)
@@ -55,25 +63,111 @@ class Encoder:
             return output_path
 
     def _encode(self, output: Path) -> None:
-        tempdir = TempDir()
-        zipped_path = tempdir.path / "zipped.bin"
-        self._zip_file(zipped_path)
-
-        video_encoder = VideoEncoder(output, self._settings)
-        for chunk in self._read_chunks(zipped_path):
-            if self._settings.ecc_symbols:
-                chunk = apply_ecc(chunk, self._settings.ecc_symbols)
-            pixels = bytes_to_pixels(chunk, self._settings.bits_per_pixel)
-            video_encoder.feed(pixels)
-
-        video_encoder.close()
-        tempdir.close()
-
-    def _zip_file(self, output_path: Path) -> None:
-        with open(self._input_file, "rb") as f_in, gzip.open(
-            output_path, "wb"
-        ) as f_out:
-            shutil.copyfileobj(f_in, f_out)
+        """Streams the input file through compression, error correction and the
+        transformation into pixels, straight into the video: memory use does not
+        depend on the size of the file, and nothing is written to disk but the video.
+        Reading and compressing run in a thread of their own, error correction and
+        the transformation in a pool of workers (see pipeline.py), while this thread
+        feeds the video encoder.
+        """
+        compression = self._choose_compression()
+        self._metadata.compression = compression
+        file_hash = hashlib.new(self._settings.hash_algorithm.value)
+        checksum_writer = self._checksum_writer(
+            max_compressed_size(self._input_file.stat().st_size, compression)
+        )
+
+        if self._settings.parallel_segments > 1:
+            video_encoder = SegmentedVideoEncoder(output, self._settings)
+        else:
+            video_encoder = VideoEncoder(output, self._settings)
+        if self._settings.pilot_frame:
+            video_encoder.feed(pilot_frame(self._settings))
+        self.timings = timings = pipeline.Timings()
+        workers, depth = self._settings.workers, self._settings.queue_depth
+        chunks = pipeline.prefetch(
+            self._data_chunks(file_hash, compression, checksum_writer), depth
+        )
+        if self._settings.ecc_symbols:
+            apply_ecc_ = timings.timed("ecc", self._apply_ecc)
+            chunks = pipeline.ordered_map(apply_ecc_, chunks, workers, depth)
+        if self._settings.chroma_bits_per_pixel:  # See bytes_to_frames()
+            chunks = util.rechunk(chunks, frame_capacity(self._settings))
+        transform = timings.timed("transform", self._transform)
+        for frames in pipeline.ordered_map(transform, chunks, workers, depth):
+            with timings.time("encode video"):
+                video_encoder.feed(frames)
+        with timings.time("encode video"):
+            video_encoder.close()
+
+        self._metadata.file_hash = file_hash.hexdigest()
+        self._metadata.data_size = checksum_writer.data_size
+        self._metadata.checksums = checksum_writer.finish(
+            self._encoded_size(checksum_writer.data_size)
+        )
+
+    def _data_chunks(
+        self,
+        file_hash: "hashlib._Hash",
+        compression: Compression,
+        checksum_writer: ChecksumWriter,
+    ) -> Generator[ndarr_1d_uint8, None, None]:
+        """Yields the compressed input file, in chunks error correction can be
+        applied to. The checksums are computed on the way."""
+        chunks = self.timings.timed_iter("read", self._read_chunks(file_hash))
+        chunks = self.timings.timed_stage(
+            "compress", partial(compress_chunks, compression=compression), chunks
+        )
+        for chunk in util.rechunk(chunks, self._chunk_size(), pad=False):
+            checksum_writer.feed(chunk)
+            yield chunk
+
+    def _apply_ecc(self, chunk: bytes_like) -> ndarr_1d_uint8:
+        return apply_ecc(
+            chunk,
+            self._settings.ecc_symbols,
+            self._settings.interleave_depth,
+            self._settings.error_correction,
+        )
+
+    def _transform(self, chunk: bytes_like) -> ndarr_1d_uint8:
+        with pipeline.kernel_lock():
+            return bytes_to_frames(chunk, self._settings)
+
+    def _checksum_writer(self, max_data_size: int) -> ChecksumWriter:
+        """Regions hold whole groups of codewords, so each can be decoded on its own.
+        The size of the compressed data is only known at the end, so the regions are
+        made large enough for {max_data_size} bytes."""
+        ecc_symbols, fec = self._settings.ecc_symbols, self._settings.error_correction
+        if ecc_symbols:
+            depth = self._settings.interleave_depth
+            unit = block_size(ecc_symbols, fec) * depth
+            decoded_unit = message_size(ecc_symbols, fec) * depth
+        else:
+            unit = decoded_unit = 255
+        size = region_size(self._encoded_size(max_data_size), unit)
+        return ChecksumWriter(size, size // unit * decoded_unit)
+
+    def _encoded_size(self, data_size: int) -> int:
+        """Returns the size of {data_size} bytes once error correction is applied."""
+        ecc_symbols = self._settings.ecc_symbols
+        if not ecc_symbols:
+            return data_size
+        return encoded_size(
+            data_size,
+            ecc_symbols,
+            self._settings.interleave_depth,
+            self._settings.error_correction,
+        )
+
+    def _choose_compression(self) -> Compression:
+        """Skips compression for files that would hardly get any smaller."""
+        compression = self._settings.compression
+        if compression is not Compression.NONE and not is_compressible(
+            self._input_file
+        ):
+            return Compression.NONE
+        return compression
 
     def _archive_dir_with_readme(self, input_directory: Path, output: Path) -> Path:
         """Adds readme to given directory and archives its contens."""
@@ -90,15 +184,26 @@ class Encoder:
         with open(to_path, "at") as readme:
             readme.write(self._metadata.export_as_base64())
 
-    def _read_chunks(self, file: Path) -> bytes:
-        """Reads the input file in PROPERLY SIZED chunks, returning it in bytes.
-        This bytes object thus has a length that is a factor of (255 - ecc_symbols)!"""
-        chunk_size = (255 - self._settings.ecc_symbols) * 100_000  # See apply_ecc()
-        with open(file, "rb") as f:
+    def _chunk_size(self) -> int:
+        """Returns the size of the chunks error correction is applied to. This is a
+        factor of message_size(ecc_symbols, error_correction) * interleave_depth!"""
+        chunk_size = 255 * 100_000
+        ecc_symbols, fec = self._settings.ecc_symbols, self._settings.error_correction
+        if ecc_symbols:  # See apply_ecc()
+            depth = self._settings.interleave_depth
+            groups = max(chunk_size // (block_size(ecc_symbols, fec) * depth), 1)
+            chunk_size = message_size(ecc_symbols, fec) * depth * groups
+        return chunk_size
+
+    def _read_chunks(self, file_hash: "hashlib._Hash") -> Generator[bytes, None, None]:
+        """Reads the input file in chunks, hashing it on the way."""
+        chunk_size = self._chunk_size()
+        with open(self._input_file, "rb") as f:
             while True:
                 binary_data = f.read(chunk_size)
                 if not binary_data:
                     break
+                file_hash.update(binary_data)
                 yield binary_data
 
     def _upload(self, input_file: Path) -> str:
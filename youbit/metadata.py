@@ -5,31 +5,49 @@ from dataclasses import dataclass
 from importlib.metadata import version
 from typing import Optional
 
-from youbit.settings import Settings
+from youbit.checksums import ChecksumTable
+from youbit.settings import Compression, Settings
 
 
 @dataclass
 class Metadata:
     _settings: Optional[Settings] = None
     filename: Optional[str] = None
-    md5_hash: Optional[str] = None
+    md5_hash: Optional[str] = None  # Only set by older versions, see file_hash
     youbit_version: str = version("youbit")
+    checksums: Optional[ChecksumTable] = None
+    file_hash: Optional[str] = None  # Hashed with settings.hash_algorithm
+    compression: Optional[Compression] = None  # None for older versions: gzip
+    data_size: Optional[int] = None  # Of the (compressed) data, without padding
 
     def __init__(
         self,
         settings: Optional[Settings] = None,
         filename: Optional[str] = None,
         md5_hash: Optional[str] = None,
+        checksums: Optional[ChecksumTable] = None,
+        file_hash: Optional[str] = None,
+        compression: Optional[Compression] = None,
+        data_size: Optional[int] = None,
     ) -> None:
         self.settings = settings
         self.filename = filename
         self.md5_hash = md5_hash
+        self.checksums = checksums
+        self.file_hash = file_hash
+        self.compression = compression
+        self.data_size = data_size
         self.youbit_version = version("youbit")
 
     @staticmethod
     def create_from_base64(b64: str) -> Metadata:
         return pickle.loads(base64.b64decode(bytes(b64, encoding="utf8")))
 
+    @property
+    def expected_hash(self) -> Optional[str]:
+        """The hash of the original file, as computed with settings.hash_algorithm."""
+        return self.file_hash or self.md5_hash
+
     def export_as_base64(self) -> str:
         base64_string = base64.b64encode(pickle.dumps(self)).decode("utf8")
         return base64_string
@@ -0,0 +1,121 @@
+"""
+The pilot frame: a frame of known, pseudo-random data the encoder puts in front of
+the video when settings.pilot_frame is set.
+
+YouTube's compression shifts the levels of the pixels around, so the fixed
+thresholds pixels_to_bytes() reads them with are not always the best ones. What
+became of the pixels of the pilot frame tells the decoder where every level ended
+up, and from that, the thresholds that read the most pixels correctly.
+Those thresholds end up in a table of 256 values, which moves every pixel value
+to where the fixed thresholds read it the same way.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from youbit.settings import BitsPerPixel, Settings
+from youbit.transform import MAPPING, bytes_to_frames, frame_capacity, frame_planes
+from youbit.types import ndarr_1d_uint8
+
+
+PILOT_SEED = 0x59_6F_75_42  # "YouB"
+
+
+def pilot_frame(settings: Settings) -> ndarr_1d_uint8:
+    """Returns the values of the pilot frame, as bytes_to_frames() lays them out."""
+    rng = np.random.default_rng(PILOT_SEED)
+    data = rng.integers(0, 256, frame_capacity(settings), dtype=np.uint8)
+    return bytes_to_frames(data, settings)
+
+
+def read_pilot_frame(arr: ndarr_1d_uint8, settings: Settings) -> list[ndarr_1d_uint8]:
+    """Returns a threshold table (see threshold_table()) for the luma plane, and for
+    the chroma planes if they hold data, from the values read back from the pilot
+    frame."""
+    expected = pilot_frame(settings)
+    if arr.size != expected.size:
+        raise ValueError(
+            f"The pilot frame holds {arr.size} values instead of {expected.size}."
+        )
+    (height, width), bpp = frame_planes(settings)[0]
+    tables = [threshold_table(arr[: height * width], expected[: height * width], bpp)]
+    if settings.chroma_bits_per_pixel:
+        tables.append(
+            threshold_table(
+                arr[height * width :],
+                expected[height * width :],
+                settings.chroma_bits_per_pixel,
+            )
+        )
+    return tables
+
+
+def threshold_table(
+    received: ndarr_1d_uint8, expected: ndarr_1d_uint8, bpp: BitsPerPixel
+) -> ndarr_1d_uint8:
+    """Returns a table that moves every value that was {received} for the pixels that
+    were {expected}, to where the fixed thresholds of pixels_to_bytes() put the same
+    level. Values keep their distance to the nearest threshold, as far as possible,
+    so byte_confidence() still works on them.
+
+    The threshold between two levels is the value that reads the fewest pixels of
+    the pilot frame wrong, found with a histogram of the values received per level.
+    """
+    levels = 1 << bpp.value
+    step = 256 >> bpp.value
+    expected_levels = np.searchsorted(MAPPING[bpp], expected)
+    histogram = np.bincount(
+        expected_levels * 256 + received, minlength=levels * 256
+    ).reshape(levels, 256)
+    cumulative = np.cumsum(histogram, axis=1)
+
+    values = np.arange(256)
+    thresholds = np.arange(1, levels) * step  # The first value of every level
+    for level in range(1, levels):
+        lower, upper = histogram[level - 1], histogram[level]
+        if not lower.any() or not upper.any():
+            continue
+        # Only look between the average values the two levels were received at
+        start = int(round(np.average(values, weights=lower))) + 1
+        end = int(round(np.average(values, weights=upper)))
+        if start > end:
+            continue
+        candidates = np.arange(start, end + 1)
+        errors = (
+            cumulative[level - 1, -1]
+            - cumulative[level - 1, candidates - 1]
+            + cumulative[level, candidates - 1]
+        )
+        best = candidates[errors == errors.min()]
+        thresholds[level - 1] = best[best.size // 2]
+
+    level = np.searchsorted(thresholds, values, side="right")
+    bounds = np.concatenate(([-256], thresholds, [512]))
+    lower_distance = values - bounds[level]
+    upper_distance = bounds[level + 1] - 1 - values
+    cap = step // 2 - 1
+    rest = np.where(
+        lower_distance <= upper_distance,
+        np.minimum(lower_distance, cap),
+        step - 1 - np.minimum(upper_distance, cap),
+    )
+    rest[level == 0] = step - 1 - np.minimum(upper_distance[level == 0], step - 1)
+    top = level == levels - 1
+    rest[top] = np.minimum(lower_distance[top], step - 1)
+    return (level * step + rest).astype(np.uint8)
+
+
+def apply_tables(
+    arr: ndarr_1d_uint8, tables: list[ndarr_1d_uint8], settings: Settings
+) -> ndarr_1d_uint8:
+    """Moves the values of {arr} through the tables of read_pilot_frame(). With data
+    in the chroma planes, {arr} must hold a whole number of frames."""
+    if len(tables) == 1:
+        return np.take(tables[0], arr)
+    planes = frame_planes(settings)
+    (height, width), _ = planes[0]
+    frames = arr.reshape(-1, sum(height * width for (height, width), _ in planes))
+    output = np.empty_like(frames)
+    output[:, : height * width] = np.take(tables[0], frames[:, : height * width])
+    output[:, height * width :] = np.take(tables[1], frames[:, height * width :])
+    return output.ravel()
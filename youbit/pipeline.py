@@ -0,0 +1,162 @@
+"""
+The stages of encoding and decoding run at the same time: while the video encoder
+or decoder works on one chunk, other chunks go through error correction and the
+(de)transformation in a pool of worker threads. The heavy lifting in every stage
+(PyAV, creedsolo, numba, zlib) releases the GIL.
+
+Queues between the stages are bounded by settings.queue_depth, so memory use does
+not depend on the size of the file. Timings tells which stage bounds throughput.
+"""
+from __future__ import annotations
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from time import perf_counter
+from typing import Any, Callable, Generator, Iterable, Iterator, TypeVar
+
+import numba
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Held around numba's parallel kernels when workers call them: numba's default
+# 'workqueue' threading layer is not safe to call from several threads at once.
+KERNEL_LOCK = threading.Lock()
+
+_DONE = object()
+
+
+def kernel_lock() -> AbstractContextManager:
+    """Returns KERNEL_LOCK if numba runs its parallel kernels with the 'workqueue'
+    threading layer, or might (it only picks one on the first launch). With 'tbb' or
+    'omp', workers can run the kernels at the same time and nothing is locked."""
+    try:
+        layer = numba.threading_layer()
+    except ValueError:
+        return KERNEL_LOCK
+    return KERNEL_LOCK if layer == "workqueue" else nullcontext()
+
+
+class Timings:
+    """Adds up the time every stage of a pipeline spends working, over all of its
+    threads. Time spent waiting on other stages is left out, so the stage with the
+    most time is the one that bounds throughput."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return ", ".join(f"{stage}: {s:.2f}s" for stage, s in self.seconds.items())
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, perf_counter() - start)
+
+    def timed(self, stage: str, func: Callable[..., R]) -> Callable[..., R]:
+        """Returns {func}, timing every call."""
+
+        def timed_func(*args: Any) -> R:
+            with self.time(stage):
+                return func(*args)
+
+        return timed_func
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Generator[T, None, None]:
+        """Yields the items of {iterable}, timing how long every one takes to get."""
+        iterator = iter(iterable)
+        while True:
+            with self.time(stage):
+                item = next(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+
+    def timed_stage(
+        self,
+        stage: str,
+        func: Callable[[Iterable[T]], Iterable[R]],
+        iterable: Iterable[T],
+    ) -> Generator[R, None, None]:
+        """Yields the items of func(iterable), a generator that pulls items from
+        {iterable} as it goes. The time spent waiting on {iterable} is left out."""
+        upstream = Timings()
+        output = iter(func(upstream.timed_iter(stage, iterable)))
+        while True:
+            waited = upstream.seconds.get(stage, 0.0)
+            start = perf_counter()
+            item = next(output, _DONE)
+            waited = upstream.seconds.get(stage, 0.0) - waited
+            self.add(stage, perf_counter() - start - waited)
+            if item is _DONE:
+                return
+            yield item
+
+
+def ordered_map(
+    func: Callable[[T], R], iterable: Iterable[T], workers: int, depth: int
+) -> Generator[R, None, None]:
+    """Like map(), with {func} running in a pool of {workers} threads. Up to {depth}
+    items are being worked on, or waiting to be yielded, at a time. Results are
+    yielded in the order of {iterable}."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def prefetch(iterable: Iterable[T], depth: int) -> Generator[T, None, None]:
+    """Yields the items of {iterable}, which is run in a thread of its own, up to
+    {depth} items ahead. An exception it raises is raised here instead."""
+    items: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not _put(items, (item, None), stop):
+                    return
+        except BaseException as e:
+            _put(items, (_DONE, e), stop)
+            return
+        _put(items, (_DONE, None), stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _put(items: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Puts {item} in the queue, unless the consumer went away in the meantime."""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
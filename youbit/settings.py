@@ -13,6 +13,41 @@ class BitsPerPixel(Enum):
     ONE = 1
     TWO = 2
     THREE = 3
+    FOUR = 4  # Experimental: 16 grey levels are only 16 values apart.
+
+
+class ErrorCorrection(Enum):
+    REED_SOLOMON = auto()
+    XOR_PARITY = auto()
+
+
+class Compression(Enum):
+    NONE = auto()
+    GZIP = auto()
+    ZSTD = auto()
+    LZ4 = auto()
+
+
+class Preset(Enum):
+    """The libx264 preset the video is encoded with. Faster presets make larger
+    videos, which YouTube compresses harder. The value is the name x264 knows."""
+
+    ULTRAFAST = "ultrafast"
+    SUPERFAST = "superfast"
+    VERYFAST = "veryfast"
+    FASTER = "faster"
+    FAST = "fast"
+    MEDIUM = "medium"
+    SLOW = "slow"
+    SLOWER = "slower"
+    VERYSLOW = "veryslow"
+
+
+class HashAlgorithm(Enum):
+    """The value is the name hashlib knows the algorithm by."""
+
+    MD5 = "md5"
+    BLAKE2B = "blake2b"
 
 
 class Browser(Enum):
@@ -32,6 +67,19 @@ class Settings:
     _constant_rate_factor: int = 18
     _null_frames: bool = False
     _browser: Optional[Browser] = None
+    _interleave_depth: int = 1
+    _error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON
+    _soft_decision: bool = False
+    _hash_algorithm: HashAlgorithm = HashAlgorithm.MD5
+    _chroma_bits_per_pixel: Optional[BitsPerPixel] = None  # None: no chroma payload
+    _block_size: int = 1
+    _pilot_frame: bool = False
+    _compression: Compression = Compression.GZIP
+    _workers: int = 2  # Threads for error correction and the (de)transformation
+    _queue_depth: int = 2  # Chunks every stage works ahead, memory use grows with it
+    _preset: Preset = Preset.MEDIUM
+    _lossless: bool = False  # Only for local use, YouTube re-encodes every video
+    _parallel_segments: int = 1  # Video segments encoded at once, in processes
 
     def __init__(
         self,
@@ -41,6 +89,19 @@ class Settings:
         constant_rate_factor: int = 18,
         null_frames: bool = False,
         browser: Optional[Browser] = None,
+        interleave_depth: int = 1,
+        error_correction: ErrorCorrection = ErrorCorrection.REED_SOLOMON,
+        soft_decision: bool = False,
+        hash_algorithm: HashAlgorithm = HashAlgorithm.MD5,
+        chroma_bits_per_pixel: Optional[BitsPerPixel] = None,
+        block_size: int = 1,
+        pilot_frame: bool = False,
+        compression: Compression = Compression.GZIP,
+        workers: int = 2,
+        queue_depth: int = 2,
+        preset: Preset = Preset.MEDIUM,
+        lossless: bool = False,
+        parallel_segments: int = 1,
     ) -> None:
         self.resolution = resolution
         self.bits_per_pixel = bits_per_pixel
@@ -48,6 +109,19 @@ class Settings:
         self.constant_rate_factor = constant_rate_factor
         self.null_frames = null_frames
         self.browser = browser
+        self.interleave_depth = interleave_depth
+        self.error_correction = error_correction
+        self.soft_decision = soft_decision
+        self.hash_algorithm = hash_algorithm
+        self.chroma_bits_per_pixel = chroma_bits_per_pixel
+        self.block_size = block_size
+        self.pilot_frame = pilot_frame
+        self.compression = compression
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.preset = preset
+        self.lossless = lossless
+        self.parallel_segments = parallel_segments
 
     @property
     def resolution(self) -> Resolution:
@@ -108,3 +182,133 @@ class Settings:
         if not isinstance(value, Browser) and value is not None:
             raise ValueError("Value must be a Browser or None.")
         self._browser = value
+
+    @property
+    def interleave_depth(self) -> int:
+        return self._interleave_depth
+
+    @interleave_depth.setter
+    def interleave_depth(self, value: int) -> None:
+        if not 1 <= value <= 65535:
+            raise ValueError("Value must be between 1 and 65535 inclusive.")
+        self._interleave_depth = value
+
+    @property
+    def error_correction(self) -> ErrorCorrection:
+        return self._error_correction
+
+    @error_correction.setter
+    def error_correction(self, value: ErrorCorrection) -> None:
+        if not isinstance(value, ErrorCorrection):
+            raise ValueError("Value must be an ErrorCorrection object.")
+        self._error_correction = value
+
+    @property
+    def soft_decision(self) -> bool:
+        return self._soft_decision
+
+    @soft_decision.setter
+    def soft_decision(self, value: bool) -> None:
+        if not isinstance(value, bool):
+            raise ValueError("Value must be a boolean.")
+        self._soft_decision = value
+
+    @property
+    def hash_algorithm(self) -> HashAlgorithm:
+        return self._hash_algorithm
+
+    @hash_algorithm.setter
+    def hash_algorithm(self, value: HashAlgorithm) -> None:
+        if not isinstance(value, HashAlgorithm):
+            raise ValueError("Value must be a HashAlgorithm object.")
+        self._hash_algorithm = value
+
+    @property
+    def chroma_bits_per_pixel(self) -> Optional[BitsPerPixel]:
+        return self._chroma_bits_per_pixel
+
+    @chroma_bits_per_pixel.setter
+    def chroma_bits_per_pixel(self, value: Optional[BitsPerPixel]) -> None:
+        if not isinstance(value, BitsPerPixel) and value is not None:
+            raise ValueError("Value must be a BitsPerPixel or None.")
+        self._chroma_bits_per_pixel = value
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    @block_size.setter
+    def block_size(self, value: int) -> None:
+        if value not in (1, 2, 4):
+            raise ValueError("Value must be 1, 2 or 4.")
+        self._block_size = value
+
+    @property
+    def pilot_frame(self) -> bool:
+        return self._pilot_frame
+
+    @pilot_frame.setter
+    def pilot_frame(self, value: bool) -> None:
+        if not isinstance(value, bool):
+            raise ValueError("Value must be a boolean.")
+        self._pilot_frame = value
+
+    @property
+    def compression(self) -> Compression:
+        return self._compression
+
+    @compression.setter
+    def compression(self, value: Compression) -> None:
+        if not isinstance(value, Compression):
+            raise ValueError("Value must be a Compression object.")
+        self._compression = value
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @workers.setter
+    def workers(self, value: int) -> None:
+        if not 1 <= value <= 64:
+            raise ValueError("Value must be between 1 and 64 inclusive.")
+        self._workers = value
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    @queue_depth.setter
+    def queue_depth(self, value: int) -> None:
+        if not 1 <= value <= 64:
+            raise ValueError("Value must be between 1 and 64 inclusive.")
+        self._queue_depth = value
+
+    @property
+    def preset(self) -> Preset:
+        return self._preset
+
+    @preset.setter
+    def preset(self, value: Preset) -> None:
+        if not isinstance(value, Preset):
+            raise ValueError("Value must be a Preset object.")
+        self._preset = value
+
+    @property
+    def lossless(self) -> bool:
+        return self._lossless
+
+    @lossless.setter
+    def lossless(self, value: bool) -> None:
+        if not isinstance(value, bool):
+            raise ValueError("Value must be a boolean.")
+        self._lossless = value
+
+    @property
+    def parallel_segments(self) -> int:
+        return self._parallel_segments
+
+    @parallel_segments.setter
+    def parallel_segments(self, value: int) -> None:
+        if not 1 <= value <= 64:
+            raise ValueError("Value must be between 1 and 64 inclusive.")
+        self._parallel_segments = value
@@ -2,67 +2,192 @@
 This file concerns itself with the transformation of binary data
 in such a way that it can be used as pixel-values in a picture or video.
 """
+from typing import Optional, Union
+
 import numpy as np
-from numba import njit, prange
-from typing import Union
+from numba import njit, prange, types
 
-from youbit.settings import BitsPerPixel
+from youbit.settings import BitsPerPixel, Settings
 from youbit.types import ndarr_1d_uint8
 
 
+MAPPING = {
+    BitsPerPixel.ONE: np.array([0, 255], dtype=np.uint8),
+    BitsPerPixel.TWO: np.array([0, 96, 160, 255], dtype=np.uint8),
+    BitsPerPixel.THREE: np.array([0, 48, 80, 112, 144, 176, 208, 255], dtype=np.uint8),
+    BitsPerPixel.FOUR: np.array(
+        [0, 24, 40, 56, 72, 88, 104, 120, 136, 152, 168, 184, 200, 216, 232, 255],
+        dtype=np.uint8,
+    ),
+}
+
+
+def _build_table(bits: int, bpp: BitsPerPixel) -> np.ndarray:
+    """Returns a table with the pixels for every possible group of {bits} bits."""
+    pixels = bits // bpp.value
+    shifts = np.arange(pixels - 1, -1, -1) * bpp.value
+    values = np.arange(1 << bits)[:, np.newaxis] >> shifts & ((1 << bpp.value) - 1)
+    return MAPPING[bpp][values]
+
+
+# Every byte becomes 8 pixels (bpp 1), 4 pixels (bpp 2) or 2 pixels (bpp 4). With a
+# bpp of 3, every 3 bytes become 8 pixels: two halves of 12 bits, each looked up in
+# a table of 16 KB.
+_TABLE_BPP1 = _build_table(8, BitsPerPixel.ONE)
+_TABLE_BPP2 = _build_table(8, BitsPerPixel.TWO)
+_TABLE_BPP3 = _build_table(12, BitsPerPixel.THREE)
+_TABLE_BPP4 = _build_table(8, BitsPerPixel.FOUR)
+
+# bytes_to_pixels() also takes read-only input, like np.frombuffer() of a bytes object.
+_SIGNATURES = [
+    types.void(types.uint8[::1], types.uint8[::1]),
+    types.void(types.Array(types.uint8, 1, "C", readonly=True), types.uint8[::1]),
+]
+
+
+def pixel_count(data_size: int, bpp: BitsPerPixel) -> int:
+    """Returns the amount of pixels bytes_to_pixels() makes of {data_size} bytes."""
+    if bpp is BitsPerPixel.THREE:
+        return -(data_size // -3) * 8
+    return data_size * 8 // bpp.value
+
+
+def frame_planes(settings: Settings) -> list[tuple[tuple[int, int], BitsPerPixel]]:
+    """Returns the shape (height, width) of every plane of a frame that holds data,
+    with the bpp it holds. Without chroma_bits_per_pixel, that is only the luma
+    plane. Otherwise, it is followed by the two chroma planes of a yuv420p frame,
+    of half the width and height. Shapes are counted in blocks of block_size by
+    block_size pixels, which each hold a single value."""
+    width, height = settings.resolution.value
+    block_size = settings.block_size
+    planes = [((height // block_size, width // block_size), settings.bits_per_pixel)]
+    if settings.chroma_bits_per_pixel:
+        chroma_shape = (height // 2 // block_size, width // 2 // block_size)
+        planes += [(chroma_shape, settings.chroma_bits_per_pixel)] * 2
+    return planes
+
+
+def frame_capacity(settings: Settings) -> int:
+    """Returns the amount of bytes a single frame holds."""
+    return sum(
+        height * width * bpp.value // 8
+        for (height, width), bpp in frame_planes(settings)
+    )
+
+
+def bytes_to_frames(
+    input_data: Union[ndarr_1d_uint8, bytes], settings: Settings
+) -> ndarr_1d_uint8:
+    """Like bytes_to_pixels(), for the planes of frames with the given settings (see
+    frame_planes()), one after the other. The luma plane of a frame holds its first
+    bytes, the chroma planes the rest. With chroma_bits_per_pixel, the input must
+    hold a whole number of frames, see frame_capacity().
+    """
+    if not settings.chroma_bits_per_pixel:
+        return bytes_to_pixels(input_data, settings.bits_per_pixel)
+    if not isinstance(input_data, np.ndarray):
+        input_data = np.frombuffer(input_data, dtype=np.uint8)
+    capacity = frame_capacity(settings)
+    if input_data.size % capacity:
+        raise ValueError(
+            f"The length of the given data ({input_data.size}) is not a factor of "
+            f"the capacity of a frame ({capacity})."
+        )
+    planes = frame_planes(settings)
+    (height, width), bpp = planes[0]
+    luma_size = height * width * bpp.value // 8
+    frame_size = sum(height * width for (height, width), _ in planes)
+    frames = input_data.reshape(-1, capacity)
+    output = np.empty((frames.shape[0], frame_size), dtype=np.uint8)
+    for frame, out in zip(frames, output):
+        bytes_to_pixels(frame[:luma_size], bpp, out=out[: height * width])
+        bytes_to_pixels(
+            frame[luma_size:],
+            settings.chroma_bits_per_pixel,
+            out=out[height * width :],
+        )
+    return output.ravel()
+
+
 def bytes_to_pixels(
-    input_data: Union[ndarr_1d_uint8, bytes], bpp: BitsPerPixel
+    input_data: Union[ndarr_1d_uint8, bytes],
+    bpp: BitsPerPixel,
+    out: Optional[ndarr_1d_uint8] = None,
 ) -> ndarr_1d_uint8:
     """Transforms binary data into a uint8 numpy array representing 8 bit
     greyscale pixels for a YouBit video.
-    BEWARE: when the input has a length that is not a factor of 8, this function
-    might append nulls to make it so. You should only let this happen at the very
-    end of a file's binary data, NOT in the middle of it.
+    The pixels are written into 'out' if given, which must have a size of
+    pixel_count(input_data.size, bpp). Otherwise, a new array is returned.
+    BEWARE: with a bpp of 3, the input is padded with nulls to a length that is a
+    factor of 3. You should only let this happen at the very end of a file's binary
+    data, NOT in the middle of it.
     """
-    if isinstance(input_data, bytes):
-        input_data: ndarr_1d_uint8 = np.frombuffer(input_data, dtype=np.uint8)
-    _add_trailing_bytes_if_necessary(input_data, bpp)
-
-    SUB_FUNCTIONS = {
-        BitsPerPixel.ONE: _transform_bpp1,
-        BitsPerPixel.TWO: _transform_bpp2,
-        BitsPerPixel.THREE: _transform_bpp3
-    }
-
-    input_data = np.unpackbits(input_data)
-    output = np.zeros(int(input_data.size / bpp.value), dtype=np.uint8)
-    SUB_FUNCTIONS[bpp](input_data, output)
-    return output
+    if isinstance(input_data, np.ndarray):
+        input_data = np.ascontiguousarray(input_data)
+    else:
+        input_data = np.frombuffer(input_data, dtype=np.uint8)
+    size = pixel_count(input_data.size, bpp)
+    if out is None:
+        out = np.empty(size, dtype=np.uint8)
+    elif out.size != size:
+        raise ValueError(
+            f"The output array has a size of {out.size} instead of {size} pixels."
+        )
+
+    if bpp is BitsPerPixel.ONE:
+        _transform_bpp1(input_data, out)
+    elif bpp is BitsPerPixel.TWO:
+        _transform_bpp2(input_data, out)
+    elif bpp is BitsPerPixel.FOUR:
+        _transform_bpp4(input_data, out)
+    else:
+        full_size = input_data.size // 3 * 3
+        _transform_bpp3(input_data[:full_size], out[: full_size // 3 * 8])
+        if full_size < input_data.size:
+            trailing_bytes = _add_trailing_bytes(input_data[full_size:])
+            _transform_bpp3(trailing_bytes, out[full_size // 3 * 8 :])
+    return out
 
 
-def _add_trailing_bytes_if_necessary(
-    ndarray: ndarr_1d_uint8, bpp: BitsPerPixel
-) -> None:
+def _add_trailing_bytes(data: ndarr_1d_uint8) -> ndarr_1d_uint8:
     """With a bpp of 3, every byte cannot be transformed into a whole number of pixels.
     The smallest chunk is 3 bytes, or 24 bits, which results in 8 pixels."""
-    if bpp is BitsPerPixel.THREE and (mod := ndarray.size % 3):
-        addition = np.zeros((3 - mod), dtype=np.uint8)
-        input_data = np.append(input_data, addition)
+    output = np.zeros(3, dtype=np.uint8)
+    output[: data.size] = data
+    return output
 
 
-@njit("void(uint8[::1], uint8[::1])", parallel=True)
+@njit(_SIGNATURES, parallel=True)
 def _transform_bpp1(arr, out) -> None:
-    MAPPING = np.array([0, 255], dtype=np.uint8)
-    for i in prange(out.size):
-        out[i] = MAPPING[arr[i]]
+    for i in prange(arr.size):
+        pixels = _TABLE_BPP1[arr[i]]
+        for j in range(8):
+            out[i * 8 + j] = pixels[j]
 
 
-@njit("void(uint8[::1], uint8[::1])", parallel=True)
+@njit(_SIGNATURES, parallel=True)
 def _transform_bpp2(arr, out) -> None:
-    MAPPING = np.array([0, 96, 160, 255], dtype=np.uint8)
-    for i in prange(out.size):
-        j = i * 2
-        out[i] = MAPPING[(arr[j] << 1) | (arr[j + 1])]
+    for i in prange(arr.size):
+        pixels = _TABLE_BPP2[arr[i]]
+        for j in range(4):
+            out[i * 4 + j] = pixels[j]
 
 
-@njit("void(uint8[::1], uint8[::1])", parallel=True)
+@njit(_SIGNATURES, parallel=True)
 def _transform_bpp3(arr, out) -> None:
-    MAPPING = np.array([0, 48, 80, 112, 144, 176, 208, 255], dtype=np.uint8)
-    for i in prange(out.size):
-        j = i * 3
-        out[i] = MAPPING[(arr[j] << 2) | (arr[j + 1] << 1) | (arr[j + 2])]
+    for i in prange(arr.size // 3):
+        k = i * 3
+        x24 = (arr[k] << 16) | (arr[k + 1] << 8) | arr[k + 2]
+        high = _TABLE_BPP3[x24 >> 12]
+        low = _TABLE_BPP3[x24 & 4095]
+        for j in range(4):
+            out[i * 8 + j] = high[j]
+            out[i * 8 + 4 + j] = low[j]
+
+
+@njit(_SIGNATURES, parallel=True)
+def _transform_bpp4(arr, out) -> None:
+    for i in prange(arr.size):
+        pixels = _TABLE_BPP4[arr[i]]
+        out[i * 2] = pixels[0]
+        out[i * 2 + 1] = pixels[1]
@@ -1,4 +1,4 @@
-from typing import Literal, Any, Tuple
+from typing import Literal, Any, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
@@ -6,3 +6,4 @@ import numpy.typing as npt
 
 ndarr_1d_uint8 = np.ndarray[Tuple[Literal[1]], np.dtype[np.uint8]]
 ndarr_any = npt.NDArray[Any]
+bytes_like = Union[bytes, bytearray, memoryview, ndarr_1d_uint8]
@@ -4,11 +4,13 @@ Utility functions for YouBit.
 import re
 import hashlib
 from pathlib import Path
-from typing import Union, Any
+from typing import Union, Any, Generator, Iterable
 
 import av
 import numpy as np
 
+from youbit.types import bytes_like, ndarr_1d_uint8
+
 
 def is_url(txt: str) -> bool:
     """Check if passed string is a URL or not."""
@@ -30,6 +32,27 @@ def get_md5(file: Path) -> str:
     return md5.hexdigest()
 
 
+def rechunk(
+    chunks: Iterable[bytes_like], multiple: int, pad: bool = True
+) -> Generator[ndarr_1d_uint8, None, None]:
+    """Yields the data of {chunks} again, in arrays with a length that is a factor of
+    {multiple}. What is left at the end is padded with nulls to that length, or
+    yielded as is without {pad}."""
+    cache = np.empty(0, dtype=np.uint8)
+    for chunk in chunks:
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if cache.size:
+            data = np.concatenate((cache, data))
+        usable_size = data.size - data.size % multiple
+        cache = data[usable_size:]
+        if usable_size:
+            yield data[:usable_size]
+    if cache.size and pad:
+        yield np.concatenate((cache, np.zeros(multiple - cache.size, dtype=np.uint8)))
+    elif cache.size:
+        yield cache
+
+
 def compare_files(file1: Union[str, Path], file2: Union[str, Path]) -> dict[str, Any]:
     """Compares the binary information of 2 files, byte per byte.
     Returns a dictionary with information about the comparison.
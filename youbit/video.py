@@ -1,9 +1,14 @@
 """
 Houses the VideoEncoder and VideoDecoder class, to encode arrays into
 YouBit video's and decode those back into arrays respectively.
+SegmentedVideoEncoder encodes several parts of a video at the same time.
 """
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
 from pathlib import Path
 from typing import Any, Generator
+import os
 import warnings
 from itertools import islice
 
@@ -11,59 +16,238 @@ import av
 import numpy as np
 
 from youbit.types import ndarr_1d_uint8
-from youbit.settings import Settings
+from youbit.settings import Preset, Settings
+from youbit.transform import frame_planes
+
+
+# With these presets, x264 splits every frame in slices it encodes at the same time,
+# instead of encoding several frames at once, and does not look ahead: the encoder
+# then keeps up with the rest of the pipeline frame by frame.
+_SLICED_PRESETS = (Preset.ULTRAFAST, Preset.SUPERFAST, Preset.VERYFAST)
+
+# SegmentedVideoEncoder cuts the video in segments of about this many pixels (64 MB):
+# enough frames for the keyframe every segment starts with to hardly matter, while
+# the segments in flight take a bounded amount of memory.
+SEGMENT_PIXELS = 1 << 26
+
+
+def encoder_options(settings: Settings) -> dict[str, str]:
+    """The options VideoEncoder passes to libx264. Deblocking would smear the values
+    of neighbouring pixels into each other, so it is turned off.
+    A lossless video (qp 0) only holds keyframes: without motion search, it is much
+    faster to encode and decode."""
+    if settings.lossless:
+        return {
+            "qp": "0",
+            "preset": settings.preset.value,
+            "threads": _threads(settings),
+            "x264-params": "keyint=1",
+        }
+    x264_params = ["no-deblock=1"]
+    if settings.preset in _SLICED_PRESETS:
+        x264_params += ["sliced-threads=1", "rc-lookahead=0"]
+    return {
+        "crf": str(settings.constant_rate_factor),
+        "tune": "grain",
+        "preset": settings.preset.value,
+        "threads": _threads(settings),
+        "x264-params": ":".join(x264_params),
+    }
+
+
+def _threads(settings: Settings) -> str:
+    """As many as there are cores (0), shared by the segments encoded at once."""
+    if settings.parallel_segments == 1:
+        return "0"
+    return str(max(1, (os.cpu_count() or 1) // settings.parallel_segments))
+
+
+def frame_format(settings: Settings) -> str:
+    """Only a video that carries data in its chroma planes needs them."""
+    return "yuv420p" if settings.chroma_bits_per_pixel else "gray"
+
+
+def stream_format(settings: Settings) -> str:
+    """The pixel format libx264 encodes. Only lossless videos keep grey frames grey,
+    others are converted to yuv420p: to limited range, with neutral chroma planes."""
+    return frame_format(settings) if settings.lossless else "yuv420p"
+
+
+def _luma_table() -> ndarr_1d_uint8:
+    """The luma value libswscale turns every grey value into, when it converts a grey
+    frame to yuv420p."""
+    grey = av.VideoFrame(256, 2, "gray")
+    pixels = np.frombuffer(grey.planes[0], dtype=np.uint8)
+    pixels.reshape(-1, grey.planes[0].line_size)[:, :256] = np.arange(256)
+    luma = grey.reformat(format="yuv420p").planes[0]
+    return np.frombuffer(luma, dtype=np.uint8)[:256].copy()
+
+
+def frame_shape(settings: Settings) -> tuple[int, int]:
+    """The shape of the arrays av.VideoFrame.from_ndarray() takes. A yuv420p frame
+    holds its two chroma planes, of a quarter of the size each, below its luma plane."""
+    width, height = settings.resolution.value
+    if settings.chroma_bits_per_pixel:
+        return height * 3 // 2, width
+    return height, width
+
+
+def expand_frame(arr: ndarr_1d_uint8, settings: Settings) -> np.ndarray:
+    """Turns the values of a frame, as laid out by transform.bytes_to_frames(), into
+    an array for av.VideoFrame.from_ndarray(). Every value becomes a block of
+    block_size by block_size pixels."""
+    if settings.block_size == 1:
+        return arr.reshape(frame_shape(settings))
+    block_size = settings.block_size
+    planes = []
+    for (height, width), _ in frame_planes(settings):
+        plane, arr = arr[: height * width], arr[height * width :]
+        planes.append(
+            np.broadcast_to(
+                plane.reshape(height, 1, width, 1),
+                (height, block_size, width, block_size),
+            ).ravel()
+        )
+    return np.concatenate(planes).reshape(frame_shape(settings))
+
+
+def decimate_frame(arr: np.ndarray, settings: Settings) -> ndarr_1d_uint8:
+    """Reverses expand_frame(): every block of block_size by block_size pixels becomes
+    their average, which averages out much of the noise of the compression."""
+    arr = arr.ravel()
+    if settings.block_size == 1:
+        return arr
+    block_size = settings.block_size
+    planes = []
+    for (height, width), _ in frame_planes(settings):
+        size = height * width * block_size**2
+        plane, arr = arr[:size], arr[size:]
+        sums = plane.reshape(height, block_size, width, block_size).sum(
+            axis=(1, 3), dtype=np.uint16
+        )
+        planes.append(((sums + block_size**2 // 2) // block_size**2).ravel())
+    return np.concatenate(planes).astype(np.uint8)
+
+
+def _lossless_frame_values(frame: av.VideoFrame, pixel_format: str) -> np.ndarray:
+    """The decoder returns grey frames as yuv420p, and converting those back to grey
+    would scale their values: the luma plane already holds them as they were."""
+    if pixel_format != "gray":
+        return frame.to_ndarray(format=pixel_format)
+    plane = frame.planes[0]
+    return np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)[
+        : frame.height, : frame.width
+    ]
+
+
+def write_frame(arr: ndarr_1d_uint8, frame: av.VideoFrame, settings: Settings) -> None:
+    """Writes the values of a frame, as laid out by transform.bytes_to_frames(),
+    straight into the planes of {frame}, like expand_frame() but without copies."""
+    block_size = settings.block_size
+    for plane, ((height, width), _) in zip(frame.planes, frame_planes(settings)):
+        values, arr = arr[: height * width], arr[height * width :]
+        pixels = np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)
+        blocks = pixels[: height * block_size, : width * block_size].reshape(
+            height, block_size, width, block_size
+        )
+        blocks[...] = values.reshape(height, 1, width, 1)
+
+
+class FramePool:
+    """Hands out the same few av.VideoFrames over and over, to write the pixels of
+    the next frame into, instead of allocating a new one for every frame.
+    libx264 copies a frame before encode() returns; the other frames of the pool
+    leave some slack, should the encoder hold on to it a little longer.
+    The frames are in the pixel format of the stream, so encode() does not convert
+    them into new ones: grey values are written as the luma libswscale would make
+    of them, next to the neutral chroma planes it makes."""
+
+    def __init__(self, settings: Settings, size: int = 2) -> None:
+        width, height = settings.resolution.value
+        self.settings = settings
+        null_frame = av.VideoFrame(width, height, frame_format(settings))
+        for plane in null_frame.planes:
+            np.frombuffer(plane, dtype=np.uint8)[:] = 0
+        self._null_frame = null_frame.reformat(format=stream_format(settings))
+        self.frames = [
+            av.VideoFrame(width, height, stream_format(settings)) for _ in range(size)
+        ]
+        for frame in self.frames:
+            for plane, null_plane in zip(frame.planes, self._null_frame.planes):
+                np.frombuffer(plane, dtype=np.uint8)[:] = null_plane
+        self.next = 0
+        self.table = None
+        if stream_format(settings) != frame_format(settings):
+            self.table = _luma_table()
+            framesize = sum(h * w for (h, w), _ in frame_planes(settings))
+            self.values = np.empty(framesize, dtype=np.uint8)
+
+    def frame(self, arr: ndarr_1d_uint8) -> av.VideoFrame:
+        """Returns a frame of the pool, holding the values of {arr}."""
+        frame = self.frames[self.next]
+        self.next = (self.next + 1) % len(self.frames)
+        if self.table is not None:
+            arr = np.take(self.table, arr, out=self.values[: arr.size], mode="clip")
+        write_frame(arr, frame, self.settings)
+        frame.pts = None  # PyAV only numbers frames without a timestamp
+        return frame
+
+    def null_frame(self) -> av.VideoFrame:
+        """Returns a frame of nothing but zeros, the same one every time."""
+        self._null_frame.pts = None
+        return self._null_frame
 
 
 class VideoEncoder:
     def __init__(self, output: Path, settings: Settings) -> None:
-        self.cache = np.empty(0, dtype=np.uint8)
         self.null_frames = settings.null_frames
         self.container = av.open(str(output), mode="w")
         self.stream = self.container.add_stream("libx264", rate=1)
         self.stream.width, self.stream.height = settings.resolution.value
-        self.framesize = self.stream.width * self.stream.height
-        self.stream.options = {
-            "crf": str(settings.constant_rate_factor),
-            "tune": "grain",
-            "-x264opts": "no-deblock",
-        }
+        self.settings = settings
+        self.format = frame_format(settings)
+        self.framesize = sum(
+            height * width for (height, width), _ in frame_planes(settings)
+        )
+        # The values of a frame that is not complete yet, see _whole_frames()
+        self.partial_frame = np.empty(self.framesize, dtype=np.uint8)
+        self.partial_size = 0
+        self.frame_count = 0
+        self.stream.options = encoder_options(settings)
+        self.frame_pool = FramePool(settings)
+        self.stream.pix_fmt = stream_format(settings)
 
     def feed(self, arr: ndarr_1d_uint8) -> None:
-        """Each element of the input array is expected to represent one geyscale pixel."""
-        arr_of_frames = self._prepare_array(arr)
-        for frame in arr_of_frames:
-            av_frame = av.VideoFrame.from_ndarray(frame, format="gray")
+        """Each element of the input array is expected to represent one geyscale pixel,
+        or one block of them, see transform.bytes_to_frames() and write_frame()."""
+        for frame in self._whole_frames(arr):
+            av_frame = self.frame_pool.frame(frame)
             self.container.mux(self.stream.encode(av_frame))
+            self.frame_count += 1
             if self.null_frames:
                 self._inject_null_frame()
 
-    def _prepare_array(self, arr_correct_size: ndarr_1d_uint8) -> np.ndarray:
-        arr_with_cache = self._prepend_cache_to(arr_correct_size)
-        arr_correct_size = self._cache_surplus_elem_from(arr_with_cache)
-        reshaped_arr = arr_correct_size.reshape(
-            -1, self.stream.height, self.stream.width
-        )
-        return reshaped_arr
-
-    def _prepend_cache_to(self, arr: ndarr_1d_uint8) -> ndarr_1d_uint8:
-        if self.cache.size:
-            new_arr = np.append(self.cache, arr)
-            self.cache = np.empty(0, dtype=np.uint8)
-            return new_arr
-        return arr
-
-    def _cache_surplus_elem_from(self, arr: ndarr_1d_uint8) -> ndarr_1d_uint8:
-        """Any elements at the end of the array that cannot form a complete
-        frame, are removed and cached."""
-        if surplus := (arr.size % self.framesize):
-            self.cache = arr[-surplus:]
-            arr = arr[:-surplus]
-        return arr
+    def _whole_frames(self, arr: ndarr_1d_uint8) -> Generator[np.ndarray, None, None]:
+        """Yields the frames {arr} completes: first the one the previous call left
+        unfinished, then those that lie within {arr}, which are not copied. What
+        is left is kept for the next call, which is less than a frame."""
+        if self.partial_size:
+            taken = min(arr.size, self.framesize - self.partial_size)
+            end = self.partial_size + taken
+            self.partial_frame[self.partial_size : end] = arr[:taken]
+            self.partial_size = end
+            arr = arr[taken:]
+            if self.partial_size < self.framesize:
+                return
+            self.partial_size = 0
+            yield self.partial_frame
+        whole_size = arr.size - arr.size % self.framesize
+        yield from arr[:whole_size].reshape(-1, self.framesize)
+        self.partial_size = arr.size - whole_size
+        self.partial_frame[: self.partial_size] = arr[whole_size:]
 
     def _inject_null_frame(self) -> None:
-        null_frame = np.zeros((self.stream.height, self.stream.width), np.uint8)
-        frame = av.VideoFrame.from_ndarray(null_frame, format="gray")
-        self.container.mux(self.stream.encode(frame))
+        self.container.mux(self.stream.encode(self.frame_pool.null_frame()))
 
     def __enter__(self) -> Any:
         return self
@@ -72,17 +256,123 @@ class VideoEncoder:
         self.close()
 
     def close(self) -> None:
-        """Flushes the cache and closes the container. Must happen!"""
-        if self.cache.size:
-            padding_size = self.framesize - (self.cache.size % self.framesize)
-            padding_arr = np.zeros(padding_size, dtype=self.cache.dtype)
+        """Pads the last frame with zeros and closes the container. Must happen!
+        A video always holds a frame, even if nothing was fed: of nothing but zeros."""
+        if self.partial_size or not self.frame_count:
+            padding_arr = np.zeros(self.framesize - self.partial_size, dtype=np.uint8)
             self.feed(padding_arr)
-            assert not self.cache.size
+            assert not self.partial_size
 
         self.container.mux(self.stream.encode())
         self.container.close()
 
 
+def _encode_segment(output: Path, settings: Settings, arr: ndarr_1d_uint8) -> None:
+    with VideoEncoder(output, settings) as encoder:
+        encoder.feed(arr)
+
+
+class SegmentedVideoEncoder:
+    """Like VideoEncoder, but encodes settings.parallel_segments segments of the video
+    at the same time, each with a VideoEncoder in a process of its own. Every segment
+    holds whole frames, starts with a keyframe and refers to no other segment:
+    concat_videos() joins them into the output without encoding them again."""
+
+    def __init__(self, output: Path, settings: Settings) -> None:
+        self.output = Path(output)
+        self.settings = settings
+        framesize = sum(height * width for (height, width), _ in frame_planes(settings))
+        self.segment_size = max(1, SEGMENT_PIXELS // framesize) * framesize
+        self.segment = np.empty(self.segment_size, dtype=np.uint8)
+        self.segment_fill = 0
+        self.segments: list[Path] = []
+        self.pending: deque[Future] = deque()
+        # Forking a process that loaded numba's 'tbb' threading layer makes it hang
+        # on exit, so every process starts afresh, and imports YouBit once.
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.parallel_segments,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def feed(self, arr: ndarr_1d_uint8) -> None:
+        """See VideoEncoder.feed()."""
+        while arr.size:
+            taken = min(arr.size, self.segment_size - self.segment_fill)
+            end = self.segment_fill + taken
+            self.segment[self.segment_fill : end] = arr[:taken]
+            self.segment_fill = end
+            arr = arr[taken:]
+            if self.segment_fill == self.segment_size:
+                self._submit_segment()
+
+    def _submit_segment(self) -> None:
+        """Hands the segment to a process. While every process is busy and another
+        segment waits for one already, waits for the oldest segment to be done."""
+        path = self.output.with_name(
+            f"{self.output.stem}.{len(self.segments)}{self.output.suffix}"
+        )
+        self.segments.append(path)
+        self.pending.append(
+            self.executor.submit(
+                _encode_segment, path, self.settings, self.segment[: self.segment_fill]
+            )
+        )
+        self.segment = np.empty(self.segment_size, dtype=np.uint8)
+        self.segment_fill = 0
+        while len(self.pending) > self.settings.parallel_segments:
+            self.pending.popleft().result()
+
+    def __enter__(self) -> Any:
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._clean_up()
+
+    def close(self) -> None:
+        """Encodes the last segment, which VideoEncoder pads to a whole frame, and
+        joins the segments into the output. Must happen!"""
+        try:
+            if self.segment_fill or not self.segments:
+                self._submit_segment()
+            while self.pending:
+                self.pending.popleft().result()
+            concat_videos(self.segments, self.output)
+        finally:
+            self._clean_up()
+
+    def _clean_up(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+        for path in self.segments:
+            path.unlink(missing_ok=True)
+
+
+def concat_videos(inputs: list[Path], output: Path) -> None:
+    """Joins videos VideoEncoder made with the same settings into {output}, one after
+    the other, by copying their packets. The timestamps of every video are moved to
+    right after the end of the video before it."""
+    with av.open(str(output), mode="w") as output_container:
+        output_stream = None
+        offset = 0
+        for path in inputs:
+            with av.open(str(path)) as input_container:
+                input_stream = input_container.streams.video[0]
+                if output_stream is None:
+                    output_stream = output_container.add_stream(template=input_stream)
+                end = offset
+                for packet in input_container.demux(input_stream):
+                    if packet.dts is None:  # The empty packet that ends a stream
+                        continue
+                    packet.pts += offset
+                    packet.dts += offset
+                    end = max(end, packet.pts + packet.duration)
+                    packet.stream = output_stream
+                    output_container.mux(packet)
+                offset = end
+
+
 class VideoDecoder:
     """Only works on videos downloaded from YouTube, and whose codec is supported.
     Supports h264 and vp9."""
@@ -90,15 +380,18 @@ class VideoDecoder:
     def __init__(self, input_file: Path, settings: Settings) -> None:
         self.container = av.open(str(input_file))
         self.stream = self.container.streams.video[0]
-        if self.stream.codec_context.framerate == 1:
+        self.stream.thread_type = "AUTO"  # Decode frames on every core
+        if self.stream.codec_context.framerate == 1 and not settings.lossless:
             warnings.warn(
                 f"Video passed to {type(self).__name__} has a framerate of 1. "
                 "This probably means the video did not go though YouTube. "
                 "Beware that this decoder will only work on videos that have "
                 "gone through YouTube's own compression."
             )
-        self.framesize = (
-            self.stream.codec_context.height * self.stream.codec_context.width
+        self.settings = settings
+        self.format = frame_format(settings)
+        self.framesize = sum(
+            height * width for (height, width), _ in frame_planes(settings)
         )
         self.frames = self._create_frame_generator()
         if settings.null_frames:
@@ -108,35 +401,37 @@ class VideoDecoder:
     def extract_pixeldata(self, amount_of_pixels: int) -> ndarr_1d_uint8:
         """Can return less than the requested amount of pixeldata
         (down to an empty array) if there is no more data to extract.
+        The frames are copied straight into the returned array. What is left of the
+        last one is kept, without a copy, for the next call.
         """
-        frames = []
-        if self.cache.size:
-            frames.append(self.cache)
-            self.cache = np.empty(0, dtype=np.uint8)
-
-        frames_to_extract = -((amount_of_pixels - self.cache.size) // -self.framesize)
-        for _ in range(frames_to_extract):
-            try:
-                frames.append(next(self.frames))
-            except StopIteration:
-                break
-
-        if len(frames) == 0:
-            return np.empty(0, dtype=np.uint8)
-
-        arr = np.concatenate(frames, dtype=np.uint8)
-        if arr.size > amount_of_pixels:
-            surplus = arr.size - amount_of_pixels
-            self.cache = arr[-surplus:]
-            arr = arr[:-surplus]
-        return arr
+        output = np.empty(amount_of_pixels, dtype=np.uint8)
+        filled = 0
+        while filled < amount_of_pixels:
+            if not self.cache.size:
+                frame = next(self.frames, None)
+                if frame is None:
+                    break
+                self.cache = frame
+            taken = min(self.cache.size, amount_of_pixels - filled)
+            output[filled : filled + taken] = self.cache[:taken]
+            self.cache = self.cache[taken:]
+            filled += taken
+        return output[:filled]
 
     def _create_frame_generator(self) -> Generator[np.ndarray, None, None]:
-        if self.stream.codec_context.codec.name == "h264":
+        if self.settings.lossless:  # Did not go through YouTube: every frame counts
+            frames = self.container.decode(self.stream)
+            frame_generator = (
+                decimate_frame(
+                    _lossless_frame_values(frame, self.format), self.settings
+                )
+                for frame in frames
+            )
+        elif self.stream.codec_context.codec.name == "h264":
             self.stream.codec_context.skip_frame = "NONKEY"
             frames = self.container.decode(self.stream)
             frame_generator = (
-                frame.to_ndarray(format="gray").ravel()
+                decimate_frame(frame.to_ndarray(format=self.format), self.settings)
                 for frame in frames
                 if (frame.index - 11) % 17  # skipping duplicate keyframes
             )
@@ -144,7 +439,8 @@ class VideoDecoder:
             frames = self.container.decode(self.stream)
             frames = islice(frames, None, None, 6)
             frame_generator = (
-                frame.to_ndarray(format="gray").ravel() for frame in frames
+                decimate_frame(frame.to_ndarray(format=self.format), self.settings)
+                for frame in frames
             )
         else:
             raise RuntimeError(